@@ -0,0 +1,193 @@
+"""
+Benchmarks of the waveform generation hot paths.\n
+Run in the repo:\n
+    python benchmarks/bench_pulse_signal.py --output result.json\n
+    python benchmarks/bench_pulse_signal.py --baseline result.json\n
+Each case is timed with perf_counter (best and median of repeats) and the peak memory of one call is
+traced by tracemalloc. Results are written as JSON, a baseline JSON of an earlier run can be compared and
+the exit code is 1 if any case is slower than the baseline by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) )
+sys.path.insert( 0, ROOT )
+
+import numpy
+from pulse_signal import common_Mathfunc as cpf
+from pulse_signal.pulse import Pulse, QAM, get_Pulse_DRAG
+from pulse_signal.digital_mixer import upConversion_IQ, upConversion_RF
+from pulse_signal import pulseScript
+
+
+# Parameters of each envelope shape for a pulse of duration T
+SHAPES = {
+    "constFunc": ( cpf.constFunc, lambda T: (0.5,) ),
+    "linearFunc": ( cpf.linearFunc, lambda T: (1/T, 0.) ),
+    "rectPulseFunc": ( cpf.rectPulseFunc, lambda T: (0.5, T/2, T/4) ),
+    "gaussianFunc": ( cpf.gaussianFunc, lambda T: (0.5, T/4, T/2) ),
+    "GaussianFamily": ( cpf.GaussianFamily, lambda T: (0.5, T/4, T/2, 0.) ),
+    "derivativeGaussianFunc": ( cpf.derivativeGaussianFunc, lambda T: (0.5, T/4, T/2) ),
+    "derivativeGaussianFamily": ( cpf.derivativeGaussianFamily, lambda T: (0.5, T/4, T/2) ),
+    "HermiteFunc": ( cpf.HermiteFunc, lambda T: (1.67, 4, 4, T/2) ),
+    "derivativeHermiteFunc": ( cpf.derivativeHermiteFunc, lambda T: (1.67, 4, 4, T/2) ),
+    "GERPFunc": ( cpf.GERPFunc, lambda T: (0.5, T, 0., T/10, T/40) ),
+    "GERPFunc_fused": ( cpf.GERPFunc_fused, lambda T: (0.5, T, 0., T/10, T/40) ),
+    "GERPFunc_auto": ( cpf.GERPFunc_auto, lambda T: (0.5, T, 0., T/10, T/40) ),
+    "DRAGFunc": ( cpf.DRAGFunc, lambda T: (0.5, T/4, T/2, 0., 0.5) ),
+    "DRAGFunc_fused": ( cpf.DRAGFunc_fused, lambda T: (0.5, T/4, T/2, 0., 0.5) ),
+    "DRAGFunc_Hermite": ( cpf.DRAGFunc_Hermite, lambda T: (1.67, 4, 4, T/2, 0.5) ),
+    "DRAGFunc_Hermite_fused": ( cpf.DRAGFunc_Hermite_fused, lambda T: (1.67, 4, 4, T/2, 0.5) ),
+}
+
+BEATS = [ "flat", "gauss/4", "gaussup/8", "gaussdn/8", "drage/6/0.5/0", "dragh/", "drag/4/0.5/", "lin/1/0", "gerp/" ]
+
+
+def give_pulse( envelopeFunc:Callable, parameters:tuple, duration:float )->Pulse:
+    pulse = Pulse()
+    pulse.carrierFrequency = 5.
+    pulse.carrierPhase = 0.
+    pulse.duration = duration
+    pulse.envelopeFunc = envelopeFunc
+    pulse.parameters = parameters
+    return pulse
+
+def give_sequence( pulseCount:int, totalPoints:int )->List[Pulse]:
+    """ DRAG pulses placed back to back in totalPoints."""
+    duration = min( 40, totalPoints //(pulseCount+1) )
+    pulses = []
+    for _ in range(pulseCount):
+        pulse = get_Pulse_DRAG( duration, (0.5, duration/4, duration/2, 0., 0.5), 5. )
+        pulse.startPoint = ""  # concat to the last pulse
+        pulses.append( pulse )
+    return pulses
+
+
+def give_cases( quick:bool )->List[Tuple[str,dict,Callable]]:
+    """ (name, parameters, function to call) of each benchmark case."""
+    cases = []
+    envelopePoints = [100, 10_000] if quick else [100, 10_000, 1_000_000]
+    for shape, (envelopeFunc, give_parameters) in SHAPES.items():
+        for points in envelopePoints:
+            pulse = give_pulse( envelopeFunc, give_parameters(points), points )
+            cases.append( ( "envelope/%s/points=%d" %(shape, points), {"points": points}, lambda pulse=pulse: pulse.generate_envelope( 0, 1 ) ) )
+
+    pulseCounts = [10, 100] if quick else [10, 100, 1000]
+    totalPointsList = [10_000, 100_000] if quick else [10_000, 100_000, 1_000_000]
+    for pulseCount in pulseCounts:
+        for totalPoints in totalPointsList:
+            pulses = give_sequence( pulseCount, totalPoints )
+            qam = QAM( 1, totalPoints )
+            parameters = {"pulses": pulseCount, "totalPoints": totalPoints}
+            cases.append( ( "QAM.give_RFenvelope_IFfrequency/pulses=%d/totalPoints=%d" %(pulseCount, totalPoints), parameters,
+                            lambda qam=qam, pulses=pulses: qam.give_RFenvelope_IFfrequency( pulses ) ) )
+            cases.append( ( "QAM.give_RFIFDict/pulses=%d/totalPoints=%d" %(pulseCount, totalPoints), parameters,
+                            lambda qam=qam, pulses=pulses: qam.give_RFIFDict( pulses ) ) )
+
+    mixerPoints = [1_000, 100_000] if quick else [1_000, 100_000, 1_000_000]
+    rng = numpy.random.default_rng(0)
+    for points in mixerPoints:
+        envelope = rng.normal(size=points) +1j*rng.normal(size=points)
+        I, Q = upConversion_IQ( envelope, 0.05, (0.9,85,0.01,-0.02) )
+        cases.append( ( "upConversion_IQ/points=%d" %points, {"points": points},
+                        lambda envelope=envelope: upConversion_IQ( envelope, 0.05, (0.9,85,0.01,-0.02) ) ) )
+        cases.append( ( "upConversion_IQ/fast/points=%d" %points, {"points": points},
+                        lambda envelope=envelope: upConversion_IQ( envelope, 0.05, (0.9,85,0.01,-0.02), fast=True ) ) )
+        cases.append( ( "upConversion_RF/points=%d" %points, {"points": points},
+                        lambda I=I, Q=Q: upConversion_RF( I, Q, 4.95, (0.9,85,0.01,-0.02) ) ) )
+
+    def parse_cold():
+        pulseScript.compile_beat.cache_clear()
+        for beat in BEATS:
+            pulseScript.give_waveformInfo( beat, 40, 0.5 )
+    def parse_warm():
+        for beat in BEATS:
+            pulseScript.give_waveformInfo( beat, 40, 0.5 )
+    cases.append( ( "pulseScript.give_waveformInfo/cold", {"beats": len(BEATS)}, parse_cold ) )
+    cases.append( ( "pulseScript.give_waveformInfo/warm", {"beats": len(BEATS)}, parse_warm ) )
+    return cases
+
+
+def measure( func:Callable, repeat:int, minTime:float )->Dict[str,float]:
+    """ Best and median time of one call, and peak memory allocated in one call."""
+    timer = timeit.Timer( func, timer=time.perf_counter )
+    number = 1
+    while True:
+        if timer.timeit(number) >= minTime: break
+        number *= 2
+    times = [ t /number for t in timer.repeat( repeat=repeat, number=number ) ]
+    times.sort()
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return { "time_min": times[0], "time_median": times[len(times)//2], "loops": number, "peak_bytes": peak }
+
+def run( quick:bool=False, pattern:str=None, repeat:int=5, minTime:float=0.05 )->dict:
+    results = {}
+    for name, parameters, func in give_cases( quick ):
+        if pattern != None and pattern not in name: continue
+        results[name] = dict( parameters, **measure( func, repeat, minTime ) )
+        print( "%-70s %12.3f us %12d B" %(name, results[name]["time_min"]*1e6, results[name]["peak_bytes"]) )
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+def compare( current:dict, baseline:dict, tolerance:float )->List[str]:
+    """ Print time ratios to the baseline and return the names of cases slower than 1 +tolerance."""
+    regressions = []
+    print( "\n%-70s %10s" %("case", "time/base") )
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base == None: continue
+        ratio = result["time_min"] /base["time_min"]
+        flag = ""
+        if ratio > 1 +tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print( "%-70s %10.2f%s" %(name, ratio, flag) )
+    return regressions
+
+
+def main( argv:List[str]=None )->int:
+    parser = argparse.ArgumentParser( description="Benchmarks of pulse_signal" )
+    parser.add_argument( "--quick", action="store_true", help="smaller size sweeps" )
+    parser.add_argument( "--filter", default=None, help="only run cases with this substring in name" )
+    parser.add_argument( "--repeat", type=int, default=5 )
+    parser.add_argument( "--output", default=None, help="write results to this JSON file" )
+    parser.add_argument( "--baseline", default=None, help="compare with results in this JSON file" )
+    parser.add_argument( "--tolerance", type=float, default=0.25, help="allowed slowdown ratio to baseline" )
+    args = parser.parse_args( argv )
+
+    current = run( args.quick, args.filter, args.repeat )
+    if args.output != None:
+        with open(args.output, "w") as f:
+            json.dump( current, f, indent=1 )
+    if args.baseline != None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare( current, baseline, args.tolerance ):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit( main() )
@@ -0,0 +1,129 @@
+# Numpy
+# Typing
+from numpy import ndarray, complex128
+# Array
+from numpy import zeros, flatnonzero
+
+
+def last_nonzero( array_like:ndarray )->int:
+    """
+    Index of the last nonzero element, -1 if all elements are zero.
+    """
+    indices = flatnonzero(array_like)
+    if indices.shape[0] == 0:
+        return -1
+    else:
+        return int(indices[-1])
+
+
+def give_startPoint( cursor:int, points:int, totalPoints:int, startPoint="" )->int:
+    """
+    Start point of a pulse with given points in the sequence.\n
+    cursor: index of the last nonzero point of the sequence, -1 if the sequence is all zero\n
+    startPoint: empty string means concat right after the cursor (from the second point if the sequence is all zero)
+    """
+    if startPoint != "":
+        startPoint = int(startPoint)
+    elif cursor < 0:
+        startPoint = 1
+    else:
+        startPoint = cursor +1
+        if startPoint + points > totalPoints:
+            raise IndexError("Un-specified start makes out of sequence!")
+    if startPoint < 0:
+        raise ValueError("negative dimensions are not allowed")
+    if startPoint +points > totalPoints:
+        raise IndexError("Pulse is out of given total time !")
+    return startPoint
+
+
+class EnvelopeAssembler():
+    """
+    Write pulse envelopes into one preallocated sequence buffer.\n
+    The position of the last nonzero point (end cursor) is kept up to date,
+    so each placement only touches the points of the placed envelope.
+    """
+    def __init__ ( self, totalPoints:int, dtype=complex128 ):
+        self._buffer = zeros(totalPoints, dtype=dtype)
+        self._cursor = -1
+
+    @property
+    def buffer ( self )->ndarray:
+        """ The whole assembled sequence."""
+        return self._buffer
+
+    @property
+    def totalPoints ( self )->int:
+        """ Length of the sequence buffer."""
+        return self._buffer.shape[-1]
+
+    @property
+    def cursor ( self )->int:
+        """ Index of the last nonzero point of the sequence, -1 if the sequence is all zero."""
+        return self._cursor
+
+    def place( self, envelope:ndarray, startPoint:int )->int:
+        """
+        Add envelope to the sequence from startPoint.\n
+        Return the start point.
+        """
+        return self.add( envelope, int(startPoint) )
+
+    def concat( self, envelope:ndarray )->int:
+        """
+        Add envelope right after the last nonzero point of the sequence,
+        start from the second point if the sequence is all zero.\n
+        Return the start point.
+        """
+        return self.add( envelope, "" )
+
+    def add( self, envelope:ndarray, startPoint )->int:
+        """
+        Add envelope with the start point given by pulse, empty string means concat.\n
+        Return the start point.
+        """
+        startPoint = give_startPoint( self._cursor, envelope.shape[0], self.totalPoints, startPoint )
+        endPoint = startPoint +envelope.shape[0]
+        window = self._buffer[startPoint:endPoint]
+        window += envelope
+        self._update_cursor( startPoint, endPoint )
+        return startPoint
+
+    def _update_cursor( self, startPoint:int, endPoint:int ):
+        windowLast = last_nonzero(self._buffer[startPoint:endPoint])
+        if windowLast >= 0:
+            windowLast += startPoint
+        if self._cursor >= endPoint:
+            return
+        elif self._cursor < startPoint:
+            self._cursor = max(self._cursor, windowLast)
+        elif windowLast >= 0:
+            self._cursor = windowLast
+        else:  # the envelope cancels the tail of the sequence, search before the window
+            self._cursor = last_nonzero(self._buffer[:startPoint])
+
+
+class SequencePlanner():
+    """
+    Start points of pulses by the same rules as EnvelopeAssembler, without the sequence buffer.\n
+    Only the last nonzero point of each envelope is needed,
+    overlapped pulses are assumed not to cancel each other exactly at the tail of sequence.
+    """
+    def __init__ ( self, totalPoints:int ):
+        self.totalPoints = totalPoints
+        self._cursor = -1
+
+    @property
+    def cursor ( self )->int:
+        """ Index of the last nonzero point of the sequence, -1 if the sequence is all zero."""
+        return self._cursor
+
+    def add( self, points:int, lastNonzero:int, startPoint="" )->int:
+        """
+        Plan a pulse of given points, lastNonzero is the index of its last nonzero point (-1 if all zero).\n
+        Return the start point.
+        """
+        startPoint = give_startPoint( self._cursor, points, self.totalPoints, startPoint )
+        if lastNonzero >= 0 and startPoint +lastNonzero > self._cursor:
+            self._cursor = startPoint +lastNonzero
+        return startPoint
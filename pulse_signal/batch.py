@@ -0,0 +1,145 @@
+# Numpy
+# Typing
+from numpy import ndarray, complex128, float64, dtype
+# Array
+from numpy import empty, nan, ndim
+
+from typing import List, Sequence, Tuple
+from math import prod
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from multiprocessing.util import Finalize
+from .pulse import Pulse, QAM
+
+
+class BatchResult():
+    """
+    Compiled sequences stored in shared memory blocks.\n
+    envelopes: shape (sequences, points)\n
+    signal_I, signal_Q: shape (sequences, points), None if freqIF is not given\n
+    freqs_LO: LO frequency of each sequence (RF-IF), nan if the carrier frequency is not given\n
+    The arrays are views of the shared memory, copy them before close.
+    """
+    def __init__ ( self, sequences:int, totalPoints:int, withIQ:bool ):
+        self._blocks = []
+        self._openBlocks = []
+        self.envelopes = self._allocate( (sequences, totalPoints), complex128 )
+        if withIQ:
+            signal = self._allocate( (2, sequences, totalPoints), float64 )
+            self.signal_I, self.signal_Q = signal[0], signal[1]
+        else:
+            self.signal_I, self.signal_Q = None, None
+        self.freqs_LO = empty(sequences)
+        self.freqs_LO[:] = nan
+
+    def _allocate( self, shape:Tuple[int], dataType )->ndarray:
+        size = max( int(dtype(dataType).itemsize) *prod(shape), 1 )
+        block = shared_memory.SharedMemory(create=True, size=size)
+        self._blocks.append(block)
+        return ndarray(shape, dtype=dataType, buffer=block.buf)
+
+    @property
+    def blockInfo ( self )->List[Tuple[str,Tuple[int],str]]:
+        """ (name, shape, dtype) of each shared memory block, for the worker processes to attach."""
+        info = [ (self._blocks[0].name, self.envelopes.shape, self.envelopes.dtype.str) ]
+        if self.signal_I is not None:
+            info.append( (self._blocks[1].name, (2,)+self.signal_I.shape, self.signal_I.dtype.str) )
+        return info
+
+    def close( self ):
+        """
+        Release the shared memory, the arrays can not be used after this.\n
+        The segments are always removed, a block still exported by the caller stays mapped
+        (BufferError is raised) until close is called again after the export is released.
+        """
+        self.envelopes = None
+        self.signal_I, self.signal_Q = None, None
+        # unlink first, a block kept open by the caller does not leak its segment
+        for block in self._blocks:
+            block.unlink()
+        blocks = self._openBlocks +self._blocks
+        self._blocks, self._openBlocks = [], []
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                self._openBlocks.append(block)
+        if len(self._openBlocks) > 0:
+            raise BufferError("shared memory is still exported, close again after releasing it")
+
+    def __enter__ ( self ):
+        return self
+
+    def __exit__ ( self, *exc ):
+        self.close()
+
+
+# Views of the shared memory blocks in the worker process
+_workerBlocks = []
+_workerArrays = []
+
+def _attach_blocks( blockInfo:List[Tuple[str,Tuple[int],str]] ):
+    _detach_blocks()
+    for name, shape, dataType in blockInfo:
+        block = shared_memory.SharedMemory(name=name)
+        _workerBlocks.append(block)
+        _workerArrays.append( ndarray(shape, dtype=dataType, buffer=block.buf) )
+    # close the blocks when the worker process exits
+    Finalize( None, _detach_blocks, exitpriority=10 )
+
+def _detach_blocks():
+    # the views should be released before the blocks are closed
+    _workerArrays.clear()
+    for block in _workerBlocks:
+        block.close()
+    _workerBlocks.clear()
+
+def _compile_sequence( index:int, pulses:List[Pulse], dt:float, totalPoints:int, freqIF:float, IQMixer:tuple, arrays:List[ndarray]=None )->float:
+    """ Write the sequence to row index of shared arrays, return the LO frequency."""
+    if arrays is None: arrays = _workerArrays
+    qam = QAM( dt, totalPoints )
+    _, envelope = qam.give_RFenvelope_IFfrequency( pulses )
+    arrays[0][index] = envelope
+    if freqIF == None:
+        return nan
+    SSBResult = qam.SSB( freqIF, envelope, IQMixer=IQMixer )
+    arrays[1][0][index] = SSBResult[0]
+    arrays[1][1][index] = SSBResult[1]
+    if len(SSBResult) == 3:
+        return SSBResult[2]
+    return nan
+
+
+def compile_batch( sequences:Sequence[List[Pulse]], totalPoints:int, dt:float=1, freqIF=None, IQMixer=(1,90,0,0), processes:int=None )->BatchResult:
+    """
+    Compile independent pulse sequences with a process pool.\n
+    Each sequence is assembled by QAM.give_RFenvelope_IFfrequency (and QAM.SSB if freqIF is given),
+    the workers write the results into shared memory so no large array is sent back.\n
+    freqIF: IF frequency, or one for each sequence\n
+    IQMixer: IQMixer calibration, or one for each sequence in shape (sequences, 4)\n
+    Results are in the order of sequences and do not depend on the number of processes.\n
+    processes: number of worker processes, 1 compiles in this process.
+    """
+    freqsIF = list(freqIF) if ndim(freqIF) != 0 else [freqIF]*len(sequences)
+    IQMixers = [ tuple(mixer) for mixer in IQMixer ] if ndim(IQMixer) == 2 else [tuple(IQMixer)]*len(sequences)
+    if len(freqsIF) != len(sequences) or len(IQMixers) != len(sequences):
+        raise ValueError("freqIF and IQMixer should be given for each sequence")
+    withIQ = freqIF is not None
+    if withIQ and any( freq == None for freq in freqsIF ):
+        raise ValueError("freqIF should be given for all sequences")
+    result = BatchResult( len(sequences), totalPoints, withIQ )
+    try:
+        if processes == 1:
+            arrays = [ result.envelopes ]
+            if withIQ: arrays.append( (result.signal_I, result.signal_Q) )
+            for index, pulses in enumerate(sequences):
+                result.freqs_LO[index] = _compile_sequence( index, pulses, dt, totalPoints, freqsIF[index], IQMixers[index], arrays )
+        else:
+            with ProcessPoolExecutor( max_workers=processes, initializer=_attach_blocks, initargs=(result.blockInfo,) ) as executor:
+                futures = [ executor.submit( _compile_sequence, index, pulses, dt, totalPoints, freqsIF[index], IQMixers[index] ) for index, pulses in enumerate(sequences) ]
+                for index, future in enumerate(futures):
+                    result.freqs_LO[index] = future.result()
+    except BaseException:
+        result.close()
+        raise
+    return result
@@ -0,0 +1,61 @@
+# Numpy
+# Typing
+from numpy import ndarray
+# Array
+from numpy import array, empty, full, arange, asarray, meshgrid, stack
+# Math
+from numpy import cos, radians
+# const
+from numpy import pi
+
+from typing import Tuple
+from .digital_mixer import give_IQCoefficients, downConversion
+from .nco import give_phasor
+
+
+def give_mixerGrid( ampBalances, phaseBalances, offsetsI=0., offsetsQ=0. )->ndarray:
+    """ All combinations of the IQMixer settings, shape (settings, 4)."""
+    grid = meshgrid( ampBalances, phaseBalances, offsetsI, offsetsQ, indexing="ij" )
+    return stack( [ axis.reshape(-1) for axis in grid ], axis=-1 ).astype(float)
+
+def give_sidebandAmplitudes( IQMixers:ndarray, freq_IF:float, freq_LO:float, envelope_RF=1., points:int=1000, hardware:tuple=(1,90,0,0) )->Tuple[ndarray,ndarray,ndarray]:
+    """
+    The RF tone amplitudes of each IQMixer setting, same as upConversion_IQ( envelope_RF, freq_IF, IQMixer )
+    followed by upConversion_RF( I, Q, freq_LO, hardware ) and single-bin DFTs (amplitude 2|X|/points).\n
+    IQMixers: the corrections in shape (settings, 4) or one tuple, e.g. give_mixerGrid\n
+    freq_IF, freq_LO: unit is 1/dt\n
+    envelope_RF: envelope array, or a complex amplitude held for points\n
+    hardware: imbalance and offsets of the mixer, the image and LO leakage vanish if a setting equals it\n
+    Return amplitudes of (carrier, sideband, image) at freq_LO, freq_LO+freq_IF and freq_LO-freq_IF.
+    """
+    IQMixers = asarray(IQMixers, dtype=float)
+    single = IQMixers.ndim == 1
+    IQMixers = IQMixers.reshape(-1, 4)
+    envelope_RF = asarray(envelope_RF)
+    if envelope_RF.ndim == 0:
+        envelope_RF = full( points, envelope_RF, dtype=complex )
+    points = envelope_RF.shape[0]
+
+    # RF is linear in the real coefficients of each setting:
+    # I = Re(c_I z) -offsetI, Q = Re(c_Q z) -offsetQ, z = envelope *exp(2 pi i f n)
+    # RF = (I +hardwareI) cos(L n) +hardwareAmp (Q +hardwareQ) cos(L n +hardwarePhase)
+    z = envelope_RF *give_phasor( freq_IF, points )
+    time = arange(points)
+    cosLO = cos( 2. *pi *freq_LO *time )
+    cosLOShifted = cos( 2. *pi *freq_LO *time +radians(hardware[1]) )
+    basis = array([ z.real *cosLO, z.imag *cosLO, cosLO, z.real *cosLOShifted, z.imag *cosLOShifted, cosLOShifted ])
+    # 2X/points of the basis at the three frequencies, shape (6, 3)
+    spectrum = downConversion( basis, [freq_LO, freq_LO+freq_IF, freq_LO-freq_IF] )
+
+    coefficient_I, coefficient_Q = give_IQCoefficients( IQMixers.T )
+    coefficients = empty( (IQMixers.shape[0], 6) )
+    coefficients[:,0] = coefficient_I.real
+    coefficients[:,1] = -coefficient_I.imag
+    coefficients[:,2] = hardware[2] -IQMixers[:,2]
+    coefficients[:,3] = hardware[0] *coefficient_Q.real
+    coefficients[:,4] = -hardware[0] *coefficient_Q.imag
+    coefficients[:,5] = hardware[0] *( hardware[3] -IQMixers[:,3] )
+    amplitudes = abs( coefficients @spectrum )
+
+    if single: amplitudes = amplitudes[0]
+    return amplitudes[...,0], amplitudes[...,1], amplitudes[...,2]
@@ -1,14 +1,14 @@
 # Numpy
 # Typing
-from numpy import ndarray
+from numpy import ndarray, complex128, float64
 # Numpy array
-from numpy import array, append, zeros, ones, where, linspace
+from numpy import array, append, zeros, ones, where, linspace, ndim, empty, asarray, copyto, broadcast_to, broadcast, searchsorted
 # Numpy common math function
 from numpy import exp,sqrt
+# Numpy in-place arithmetic
+from numpy import add, subtract, multiply, divide, negative, square
 # Numpy constant
 from numpy import pi, logical_and
-# Scipy
-from scipy.special import erf
 
 
 # Gaussian Family
@@ -31,7 +31,10 @@ def derivativeGaussianFamily (x, *p)->ndarray:
         p[1]: sigma\n
         p[2]: peak position\n
     """ 
-    if p[1] != 0. :
+    if ndim(p[1]) != 0 :  # swept sigma, zero sigma gives zero
+        sigma = where( p[1] != 0., p[1], 1. )
+        return where( p[1] != 0., -p[0] / sigma**2 *(x-p[2]) *exp( -( (x-p[2]) /sigma )**2 /2), 0. )
+    elif p[1] != 0. :
         return -p[0] / p[1]**2 *(x-p[2]) *exp( -( (x-p[2]) /p[1] )**2 /2)
     else :
         return zeros(len(x))
@@ -63,7 +66,10 @@ def derivativeGaussianFunc (x, *p)->ndarray:
         p[2]: peak position \n 
     """
 
-    if p[1] != 0. :
+    if ndim(p[1]) != 0 :  # swept sigma, zero sigma gives zero
+        sigma = where( p[1] != 0., p[1], 1. )
+        return where( p[1] != 0., -p[0] / sigma**2 *(x-p[2]) *exp( -( (x-p[2]) /sigma )**2 /2), 0. )
+    elif p[1] != 0. :
         return -p[0] / p[1]**2 *(x-p[2]) *exp( -( (x-p[2]) /p[1] )**2 /2)
     else :
         return zeros(len(x))
@@ -72,22 +78,23 @@ def derivativeGaussianFunc (x, *p)->ndarray:
 # 1223 append Hermite waveform
 # ref: PHYSICAL REVIEW B 68, 224518 (2003)
 
-def HermiteFunc(x, *p)->ndarray:
+def HermiteFunc(x, *p, tg:float=None)->ndarray:
     """
     x: array like, shape (n,)\n
     p: parameters\n
         p[0]: A (1.67 recommended)\n
         p[1]: alpha (4 recommended)\n
         p[2]: beta (4 recommended)\n
-        p[3]: peak position (half gate time recommended)
+        p[3]: peak position (half gate time recommended)\n
+    tg: gate time, x[-1]-x[0] if it is not given (e.g. x is a part of the gate)
     """
-    tg = x[-1]-x[0]
+    if tg == None: tg = x[-1]-x[0]
     # given in the reference
     sigma = tg/(2*p[1])
 
     return ((1-p[2]*((x-p[3])/(p[1]*sigma))**2)*p[0]*exp(-(x-p[3])**2/(2*sigma**2)))/sigma
 
-def derivativeHermiteFunc (x, *p)->ndarray:
+def derivativeHermiteFunc (x, *p, tg:float=None)->ndarray:
     """
     return derivative Hermite
     x: array like, shape (n,) \n
@@ -95,9 +102,10 @@ def derivativeHermiteFunc (x, *p)->ndarray:
         p[0]: A (1.67 recommended)\n
         p[1]: alpha (4 recommended)\n
         p[2]: beta (4 recommended)\n 
-        p[3]: peak position (half gate time recommended)
+        p[3]: peak position (half gate time recommended)\n
+    tg: gate time, x[-1]-x[0] if it is not given
     """
-    tg = x[-1]-x[0]
+    if tg == None: tg = x[-1]-x[0]
     # given in the reference
     sigma = tg/(2*p[1])
     if tg != 0. :
@@ -182,7 +190,7 @@ def DRAGFunc ( t, *p )->ndarray:
 
 
 # 1223 append DRAG with Hermite wavefor2
-def DRAGFunc_Hermite(t, *p )->ndarray:
+def DRAGFunc_Hermite(t, *p, tg:float=None )->ndarray:
     """
     return Hermite +1j*derivative Hermite\n
     x: array like, shape (n,), the element is complex number \n
@@ -191,11 +199,166 @@ def DRAGFunc_Hermite(t, *p )->ndarray:
     p[2]: beta (4 recommended)\n 
     p[3]: peak position\n
     p[4]: derivative Hermite amplitude ratio \n
+    tg: gate time, t[-1]-t[0] if it is not given
     """
     HermiteParas = (p[0],p[1],p[2],p[3])
-    return HermiteFunc( t, *HermiteParas ) -1j*p[4]*derivativeHermiteFunc( t, *HermiteParas )
+    return HermiteFunc( t, *HermiteParas, tg=tg ) -1j*p[4]*derivativeHermiteFunc( t, *HermiteParas, tg=tg )
 
 
+
+# Fused kernels, same results as the functions above with shared terms calculated once
+# Points calculated at once, the temporary buffers of a block stay in cache
+FUSED_BLOCK_POINTS = 8192
+
+def _give_fusedBuffers( t:ndarray, p:tuple, out:ndarray, dtype, buffers:int ):
+    """ Result array, shape of a block and the temporary buffers of a fused kernel."""
+    shape = broadcast( t, *p ).shape
+    if out is None: out = empty( shape, dtype=dtype )
+    points = shape[-1]
+    blockShape = shape[:-1] +(points if points < FUSED_BLOCK_POINTS else FUSED_BLOCK_POINTS,)
+    return out, points, [ empty(blockShape) for _ in range(buffers) ]
+
+def DRAGFunc_fused ( t, *p, out:ndarray=None, dtype=complex128 )->ndarray:
+    """
+    Same as DRAGFunc, the Gaussian is calculated once and shared by its derivative.\n
+    out: complex array for the result, dtype: type of the result if out is not given \n
+    p[0]: amp \n
+    p[1]: sigma \n
+    p[2]: peak position \n
+    p[3]: shift term\n
+    p[4]: derivative Gaussian amplitude ratio \n
+    """
+    t = asarray(t)
+    out, points, (distance, gauss) = _give_fusedBuffers( t, p[:5], out, dtype, 2 )
+    sweptSigma = ndim(p[1]) != 0
+    for start in range(0, points, FUSED_BLOCK_POINTS):
+        end = start +FUSED_BLOCK_POINTS if start +FUSED_BLOCK_POINTS < points else points
+        d = distance[...,:end-start]
+        g = gauss[...,:end-start]
+        block = out[...,start:end]
+        # exp( -( (x-p2) /p1 )**2 /2)
+        subtract( t[...,start:end], p[2], out=d )
+        divide( d, p[1], out=g )
+        square( g, out=g )
+        multiply( g, -0.5, out=g )
+        exp( g, out=g )
+        # imag: -p4 *derivative Gaussian
+        if not sweptSigma and p[1] == 0.:
+            block.imag = 0.
+        else:
+            multiply( d, -p[0] / p[1]**2, out=d )
+            multiply( d, g, out=d )
+            multiply( d, -p[4], out=block.imag )
+            if sweptSigma:  # swept sigma, zero sigma gives zero
+                copyto( block.imag, 0., where=broadcast_to(asarray(p[1]) == 0., block.shape) )
+        # real: Gaussian
+        multiply( g, p[0], out=g )
+        add( g, p[3], out=block.real )
+    return out
+
+def DRAGFunc_Hermite_fused ( t, *p, out:ndarray=None, dtype=complex128, tg:float=None )->ndarray:
+    """
+    Same as DRAGFunc_Hermite, the polynomial and exponential terms are shared by the derivative.\n
+    out: complex array for the result, dtype: type of the result if out is not given \n
+    p[0]: A (1.67 recommended)\n
+    p[1]: alpha (4 recommended)\n
+    p[2]: beta (4 recommended)\n 
+    p[3]: peak position\n
+    p[4]: derivative Hermite amplitude ratio \n
+    tg: gate time, t[-1]-t[0] if it is not given
+    """
+    t = asarray(t)
+    if tg == None: tg = t[-1]-t[0]
+    sigma = tg/(2*p[1])
+    out, points, (distance, exponential, polynomial, factor) = _give_fusedBuffers( t, p[:5], out, dtype, 4 )
+    for start in range(0, points, FUSED_BLOCK_POINTS):
+        end = start +FUSED_BLOCK_POINTS if start +FUSED_BLOCK_POINTS < points else points
+        d = distance[...,:end-start]
+        e = exponential[...,:end-start]
+        u = polynomial[...,:end-start]
+        block = out[...,start:end]
+        subtract( t[...,start:end], p[3], out=d )
+        # exp( -(x-x0)**2/(2 sigma**2) )
+        square( d, out=e )
+        negative( e, out=e )
+        divide( e, 2*sigma**2, out=e )
+        exp( e, out=e )
+        # 1 -beta*((x-x0)/(alpha sigma))**2
+        divide( d, p[1]*sigma, out=u )
+        square( u, out=u )
+        multiply( u, p[2], out=u )
+        subtract( 1, u, out=u )
+        # imag: -p4 *derivative Hermite
+        if tg != 0. :
+            f = factor[...,:end-start]
+            multiply( d, p[0], out=d )
+            add( u, 2*p[2]/p[1]**2, out=f )
+            multiply( d, f, out=d )
+            multiply( d, e, out=d )
+            divide( d, -sigma**3, out=d )
+            multiply( d, -p[4], out=block.imag )
+        else :
+            block.imag = 0.
+        # real: Hermite
+        multiply( u, p[0], out=u )
+        multiply( u, e, out=u )
+        divide( u, sigma, out=block.real )
+    return out
+
+def GERPFunc_fused (x, *p, out:ndarray=None, dtype=float64 )->ndarray:
+    """
+    Same as GERPFunc, the Gaussian edges are only calculated on their own ranges.\n
+    out: array for the result, dtype: type of the result if out is not given \n
+    p[0]: amp \n
+    p[1]: width \n
+    p[2]: start \n
+    p[3]: edge width \n
+    p[4]: edge sigma \n
+    """
+    if any( ndim(para) != 0 for para in p[:5] ):  # swept parameters
+        result = GERPFunc( x, *p )
+        if out is None: return result.astype(dtype)
+        out[...] = result
+        return out
+
+    amp = p[0]
+    total_width = p[1]
+    start_pos = p[2]
+    edge_width = p[3]
+    peak_width = edge_width*2
+    edge_sigma = p[4]
+
+    flat_start = start_pos +edge_width
+    flat_width = total_width -peak_width
+    flat_end = flat_start +flat_width
+
+    x = asarray(x)
+    if out is None: out = empty( x.shape, dtype=dtype )
+    out[...] = 0.
+    if x.ndim == 1 and x.shape[0] > 0 and x[0] >= 0 and not (x[1:] < x[:-1]).any():
+        # sorted non-negative time, each part is a slice
+        raising = slice( 0, searchsorted(x, flat_start, "left") )
+        flat = slice( searchsorted(x, flat_start, "left"), searchsorted(x, flat_width+flat_start, "right") )
+        falling = slice( searchsorted(x, flat_end, "right"), x.shape[0] )
+    else:
+        raising = x < flat_start
+        flat = logical_and( abs(x)>=flat_start, abs(x)<=(flat_width+flat_start) )
+        falling = x > flat_end
+    out[raising] = gaussianFunc( x[raising], amp, edge_sigma, flat_start )
+    out[flat] += amp
+    out[falling] += gaussianFunc( x[falling], amp, edge_sigma, flat_end )
+    return out
+
+# GERPFunc is faster than GERPFunc_fused on shorter envelopes (measured crossover is about 1500 points),
+# DRAGFunc_fused and DRAGFunc_Hermite_fused are not slower at any length
+GERP_FUSED_MIN_POINTS = 1500
+
+def GERPFunc_auto ( x, *p, out:ndarray=None, dtype=float64 )->ndarray:
+    """ GERPFunc_fused for envelopes of at least GERP_FUSED_MIN_POINTS points (or out is given), otherwise GERPFunc."""
+    if out is not None or asarray(x).size >= GERP_FUSED_MIN_POINTS:
+        return GERPFunc_fused( x, *p, out=out, dtype=dtype )
+    return GERPFunc( x, *p ).astype(dtype, copy=False)
+
 if __name__ == '__main__':
     from numpy import linspace
     import matplotlib.pyplot as plt
@@ -0,0 +1,114 @@
+# Numpy
+# Typing
+from numpy import ndarray, int8, int16, int32, int64, iscomplexobj, issubdtype, signedinteger, iinfo
+# Array
+from numpy import empty, asarray, copyto, ndindex, count_nonzero
+# Math
+from numpy import multiply, rint, clip, isnan
+
+from typing import Tuple
+from .instrument import instrumented
+
+
+# Codes are calculated in float64, larger codes are not exact
+MAX_DAC_BITS = 53
+
+
+def give_codeType( bits:int ):
+    """ The smallest signed integer type for DAC codes of given bits."""
+    give_codeRange( bits )
+    for codeType, typeBits in ((int8, 8), (int16, 16), (int32, 32), (int64, 64)):
+        if bits <= typeBits:
+            return codeType
+
+def give_codeRange( bits:int )->Tuple[int,int]:
+    """ The minimum and maximum DAC codes of given bits (two's complement)."""
+    if bits < 2 or bits > MAX_DAC_BITS:
+        raise ValueError("DAC bits should be in [2, %d]" %MAX_DAC_BITS)
+    return -2**(bits-1), 2**(bits-1)-1
+
+
+def check_codeBuffer( out:ndarray, bits:int ):
+    """ Raise ValueError if the integer type of out can not hold the DAC codes of given bits."""
+    minCode, maxCode = give_codeRange(bits)
+    if not issubdtype(out.dtype, signedinteger) or iinfo(out.dtype).min > minCode or iinfo(out.dtype).max < maxCode:
+        raise ValueError("out buffer of %s can not hold %d bits codes" %(out.dtype, bits))
+
+
+@instrumented("quantize")
+def quantize( signal:ndarray, bits:int=16, fullScale:float=1., overflow:str="saturate", out:ndarray=None, blockPoints:int=2**16 )->Tuple[ndarray,int]:
+    """
+    Convert the waveform to fixed-point DAC codes, code = round( signal /fullScale *maxCode ).\n
+    bits: DAC resolution, codes are in [-2**(bits-1), 2**(bits-1)-1]\n
+    fullScale: The signal value mapped to the maximum code\n
+    overflow: "saturate" clips the codes to the range, "error" raises OverflowError\n
+    out: integer buffer (may be a strided view) in the shape of signal\n
+    blockPoints: points converted at once, the only float temporary is one block\n
+    Return the codes and the number of clipped points, NaN points raise ValueError.
+    """
+    signal = asarray(signal)
+    if iscomplexobj(signal):
+        raise TypeError("Complex waveform should be quantized as I/Q")
+    if overflow not in ("saturate", "error"):
+        raise ValueError("overflow should be 'saturate' or 'error'")
+    minCode, maxCode = give_codeRange(bits)
+    if out is None:
+        out = empty(signal.shape, dtype=give_codeType(bits))
+    elif out.shape != signal.shape:
+        raise ValueError("out buffer should be in the shape of signal")
+    else:
+        check_codeBuffer( out, bits )
+    scale = maxCode /fullScale
+
+    clipCount = 0
+    if signal.size == 0:
+        return out, clipCount
+    points = signal.shape[-1]
+    scratch = empty(min(points, blockPoints))
+    for index in ndindex(signal.shape[:-1]):
+        row = signal[index]
+        outRow = out[index]
+        for start in range(0, points, blockPoints):
+            end = start +blockPoints if start +blockPoints < points else points
+            block = scratch[:end-start]
+            multiply( row[start:end], scale, out=block )
+            rint( block, out=block )
+            if isnan(block).any():
+                raise ValueError("Waveform has NaN points")
+            blockClips = count_nonzero(block > maxCode) +count_nonzero(block < minCode)
+            if blockClips and overflow == "error":
+                raise OverflowError("Waveform exceeds the DAC full scale")
+            clipCount += int(blockClips)
+            clip( block, minCode, maxCode, out=block )
+            copyto( outRow[start:end], block, casting="unsafe" )
+    return out, clipCount
+
+def quantize_IQ( signal_I:ndarray, signal_Q:ndarray, bits:int=16, fullScale:float=1., overflow:str="saturate", interleave:bool=True, out:ndarray=None )->Tuple[ndarray,int]:
+    """
+    Convert I/Q waveforms to DAC codes, see quantize.\n
+    interleave: codes are in the order I0, Q0, I1, Q1, ... along the last axis,
+    otherwise they are stacked in shape (2,)+signal_I.shape\n
+    Return the codes and the number of clipped points of I and Q.
+    """
+    signal_I = asarray(signal_I)
+    signal_Q = asarray(signal_Q)
+    if signal_I.shape != signal_Q.shape:
+        raise ValueError("I and Q should have the same shape")
+    if interleave:
+        shape = signal_I.shape[:-1] +(2*signal_I.shape[-1],)
+    else:
+        shape = (2,) +signal_I.shape
+    if out is None:
+        out = empty(shape, dtype=give_codeType(bits))
+    elif out.shape != shape:
+        raise ValueError("out buffer should be in shape %s" %(shape,))
+    else:
+        check_codeBuffer( out, bits )
+
+    if interleave:
+        out_I, out_Q = out[...,0::2], out[...,1::2]
+    else:
+        out_I, out_Q = out[0], out[1]
+    _, clips_I = quantize( signal_I, bits, fullScale, overflow, out_I )
+    _, clips_Q = quantize( signal_Q, bits, fullScale, overflow, out_Q )
+    return out, clips_I +clips_Q
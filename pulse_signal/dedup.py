@@ -0,0 +1,130 @@
+# Numpy
+# Typing
+from numpy import ndarray, complex128, int64, uint8, dtype
+# Array
+from numpy import zeros, array, asarray, ascontiguousarray, array_equal
+
+from typing import List
+from hashlib import blake2b
+from .segment import EnvelopeSegments
+
+# Fields of a sequence table row
+TABLE_DTYPE = dtype([ ("id", int64), ("start", int64), ("repeat", int64) ])
+
+
+def give_digest( waveform:ndarray )->bytes:
+    """ Content hash of the waveform, arrays with the same dtype, shape and values have the same digest."""
+    waveform = ascontiguousarray(waveform)
+    digest = blake2b( digest_size=16 )
+    digest.update( waveform.dtype.str.encode() )
+    digest.update( str(waveform.shape).encode() )
+    digest.update( waveform.data )
+    return digest.digest()
+
+
+class WaveformTable():
+    """
+    Unique waveforms and a sequence table of (waveform id, start point, repeat count).\n
+    Each bit-identical waveform is stored once, consecutive copies of a waveform placed back to back
+    are one row with repeat count. The dense stream is the sum of every row written in order.
+    """
+    def __init__ ( self, totalPoints:int, dtype=complex128 ):
+        self.totalPoints = totalPoints
+        self.dtype = dtype
+        self._waveforms = []
+        self._ids = {}
+        self._rows = []
+
+    @property
+    def waveforms ( self )->List[ndarray]:
+        """ The unique waveforms (read only), index is the waveform id."""
+        return list(self._waveforms)
+
+    @property
+    def table ( self )->ndarray:
+        """ Sequence table, structured array with fields id, start and repeat."""
+        return array( self._rows, dtype=TABLE_DTYPE )
+
+    def __len__ ( self )->int:
+        return len(self._rows)
+
+    @property
+    def nbytes ( self )->int:
+        """ Memory of the unique waveforms."""
+        return sum( waveform.nbytes for waveform in self._waveforms )
+
+    @property
+    def denseBytes ( self )->int:
+        """ Memory of the dense stream."""
+        return self.totalPoints *dtype(self.dtype).itemsize
+
+    def give_id( self, waveform:ndarray )->int:
+        """ The id of waveform, it is stored if there is no identical one."""
+        waveform = ascontiguousarray(waveform, dtype=self.dtype)
+        digest = give_digest( waveform )
+        waveformId = self._ids.get(digest)
+        if waveformId != None and array_equal( self._waveforms[waveformId].view(uint8), waveform.view(uint8) ):
+            return waveformId
+        waveform = waveform.copy()
+        waveform.flags.writeable = False
+        self._waveforms.append( waveform )
+        self._ids[digest] = len(self._waveforms) -1
+        return len(self._waveforms) -1
+
+    def add( self, startPoint:int, waveform:ndarray, repeat:int=1 )->int:
+        """
+        Place waveform repeat times back to back from startPoint, return the waveform id.\n
+        It is merged to the last row if it continues the same waveform.
+        """
+        points = waveform.shape[-1]
+        if startPoint < 0 or repeat < 1 or startPoint +points*repeat > self.totalPoints:
+            raise IndexError("Pulse is out of given total time !")
+        waveformId = self.give_id( waveform )
+        if len(self._rows) > 0:
+            lastId, lastStart, lastRepeat = self._rows[-1]
+            if lastId == waveformId and lastStart +lastRepeat*points == startPoint:
+                self._rows[-1] = (lastId, lastStart, lastRepeat +repeat)
+                return waveformId
+        self._rows.append( (waveformId, int(startPoint), int(repeat)) )
+        return waveformId
+
+    def expand( self, out:ndarray=None )->ndarray:
+        """ Reconstruct the dense stream, see expand_table."""
+        return expand_table( self._waveforms, self.table, self.totalPoints, self.dtype, out )
+
+
+def expand_table( waveforms:List[ndarray], table:ndarray, totalPoints:int, dataType=complex128, out:ndarray=None )->ndarray:
+    """
+    Reconstruct the dense stream of a sequence table.\n
+    Rows are added in order, the repeated copies of a row are written at once.
+    """
+    if out is None:
+        out = zeros(totalPoints, dtype=dataType)
+    else:
+        out[...] = 0
+    for waveformId, startPoint, repeat in table.tolist():
+        waveform = waveforms[waveformId]
+        points = waveform.shape[-1]
+        window = out[startPoint:startPoint +points*repeat].reshape(repeat, points)
+        window += waveform
+    return out
+
+
+def give_segmentTable( segments:EnvelopeSegments )->WaveformTable:
+    """ Deduplicate the pulse envelopes of EnvelopeSegments, e.g. from QAM.give_RFSegments."""
+    table = WaveformTable( segments.totalPoints, segments.dtype )
+    for startPoint, envelope in segments:
+        table.add( startPoint, envelope )
+    return table
+
+def give_blockTable( stream:ndarray, blockPoints:int )->WaveformTable:
+    """
+    Split the dense stream into blocks of blockPoints (the AWG waveform granularity)
+    and deduplicate them, idle zeros and repeated gates become repeated rows.\n
+    The last block is shorter if the stream is not a multiple of blockPoints.
+    """
+    stream = asarray(stream)
+    table = WaveformTable( stream.shape[-1], stream.dtype )
+    for startPoint in range(0, stream.shape[-1], blockPoints):
+        table.add( startPoint, stream[startPoint:startPoint+blockPoints] )
+    return table
@@ -2,13 +2,18 @@
 # Typing
 from numpy import ndarray
 # Array
-from numpy import array, empty
+from numpy import empty, arange, asarray, ndim, newaxis, copyto, broadcast_to, atleast_1d, iscomplexobj, matmul
 # Numpy common math function
-from numpy import arctan2, cos, sin, angle, radians, sign
+from numpy import arctan2, cos, sin, exp, angle, radians, sign
 # const
 from numpy import pi
 from typing import Tuple
 from .waveform import Waveform
+from .nco import give_phasor, give_cos
+from .instrument import instrumented
+
+# Shots demodulated in one matrix product by downConversion
+DEMOD_BLOCK_SHOTS = 4096
 
 
 def leakage_suppress( signal_I, signal_Q, IQMixer:Tuple=(1,90,0,0) ):
@@ -26,15 +31,38 @@ def leakage_suppress( signal_I, signal_Q, IQMixer:Tuple=(1,90,0,0) ):
 def upconversion_LO( freq_carrier:float, freq_IF:float):
     return freq_carrier-freq_IF
 
-def upConversion_IQ( envelope_RF:ndarray, freq_IF:float, IQMixer:Tuple=(1,90,0,0), suppress_leakage = True )->Tuple[ndarray,ndarray]:
+def give_IQCoefficients( IQMixer:Tuple=(1,90,0,0) )->Tuple[complex,complex]:
+    """
+    The complex coefficients (c_I, c_Q) of IQMixer calibration,\n
+    I = Re( c_I *envelope *exp(2 pi i f t) ), Q = Re( c_Q *envelope *exp(2 pi i f t) ) before offset.
+    """
+    ampBalance = IQMixer[0]
+    phaseBalance = IQMixer[1]
+    LOShiftSign = sign(sin(radians(phaseBalance)))
+    ampI = 1. /cos(radians(abs(phaseBalance)-90))
+    coefficient_Q = ampI /ampBalance *exp( -1j *LOShiftSign*pi/2 )
+    coefficient_I = ampI *exp( 1j *(-LOShiftSign*pi/2 -radians(phaseBalance) +pi) )
+    return coefficient_I, coefficient_Q
+
+@instrumented("upconversion")
+def upConversion_IQ( envelope_RF:ndarray, freq_IF:float, IQMixer:Tuple=(1,90,0,0), suppress_leakage = True, fast:bool = False, out:ndarray = None, offset:int = 0 )->Tuple[ndarray,ndarray]:
     """
-    IFFreq unit is 1/dt of envelope_RF
+    IFFreq unit is 1/dt of envelope_RF\n
+    envelope_RF can be a (sweep, points) block, freq_IF can be given for each sweep.\n
+    fast: synthesize I/Q by one complex multiply with the IF phasor, same result within floating point tolerance.\n
+    out: (fast only) buffer in shape (2,)+envelope_RF.shape for I and Q.\n
+    offset: index of the first point, keep the IF phase continuous for chunks of a long envelope.
     """
     ampBalance = IQMixer[0]
     phaseBalance = IQMixer[1]
     offsetI = IQMixer[2]
     offsetQ = IQMixer[3]
-    time = array(range(len(envelope_RF)))
+    time = arange(offset, offset+envelope_RF.shape[-1])
+    if ndim(freq_IF) != 0: freq_IF = asarray(freq_IF)[...,newaxis]
+    if fast:
+        return _upConversion_IQ_phasor( envelope_RF, freq_IF, time, IQMixer, suppress_leakage, out, offset )
+    elif out is not None:
+        raise ValueError("out buffer is only supported in fast mode")
     LOShiftSign = sign(sin(radians(phaseBalance)))
     
     envelopeIQ = abs( envelope_RF )
@@ -51,17 +79,135 @@ def upConversion_IQ( envelope_RF:ndarray, freq_IF:float, IQMixer:Tuple=(1,90,0,0
 
     return signal_I, signal_Q
 
+def _upConversion_IQ_phasor( envelope_RF:ndarray, freq_IF, time:ndarray, IQMixer:Tuple, suppress_leakage:bool, out:ndarray, offset:int )->Tuple[ndarray,ndarray]:
+    if ndim(freq_IF) == 0:
+        mixed = envelope_RF *give_phasor( freq_IF, time.shape[-1], offset=offset )
+    else:
+        mixed = envelope_RF *exp( 2j *pi *freq_IF *time )
+    coefficient_I, coefficient_Q = give_IQCoefficients( IQMixer )
+    if suppress_leakage:
+        offsetI, offsetQ = IQMixer[2], IQMixer[3]
+    else:
+        offsetI, offsetQ = 0, 0
+    return _mix_phasor( mixed, coefficient_I, coefficient_Q, offsetI, offsetQ, out )
 
-def upConversion_RF ( I:ndarray, Q:ndarray, LOFreq:float, IQMixer:tuple=(1,90,0,0))->ndarray:
+def _mix_phasor( mixed:ndarray, coefficient_I, coefficient_Q, offsetI, offsetQ, out:ndarray )->Tuple[ndarray,ndarray]:
+    """
+    I = Re( c_I *mixed ) -offsetI, Q = Re( c_Q *mixed ) -offsetQ, mixed (envelope *phasor) is overwritten.
     """
-    IFFreq unit is 1/dt of envelope_RF
+    if out is None:
+        out = empty( (2,)+mixed.shape )
+    elif out.shape != (2,)+mixed.shape:
+        raise ValueError("out buffer should be in shape (2,)+envelope_RF.shape")
+
+    # z = c_I *envelope *phasor, then change c_I to c_Q in place
+    mixed *= coefficient_I
+    copyto( out[0], mixed.real )
+    mixed *= coefficient_Q /coefficient_I
+    copyto( out[1], mixed.real )
+    out[0] -= offsetI
+    out[1] -= offsetQ
+    return out[0], out[1]
+
+@instrumented("upconversion")
+def upConversion_IQ_channels( envelopes_RF:ndarray, freqs_IF:ndarray, IQMixers:ndarray, suppress_leakage = True, out:ndarray = None, offset:int = 0 )->Tuple[ndarray,ndarray]:
     """
-    time = array(range(len(I)))
+    Vectorized upConversion_IQ (fast mode) for multiple channels at once.\n
+    envelopes_RF: shape (channels, points)\n
+    freqs_IF: shape (channels,), unit is 1/dt of envelopes_RF\n
+    IQMixers: shape (channels, 4), the IQMixer calibration of each channel\n
+    out: buffer in shape (2, channels, points) for I and Q.\n
+    offset: index of the first point.
+    """
+    channels, points = envelopes_RF.shape
+    freqs_IF = broadcast_to( asarray(freqs_IF, dtype=float), (channels,) )
+    IQMixers = broadcast_to( asarray(IQMixers, dtype=float), (channels,4) )
+    coefficient_I, coefficient_Q = give_IQCoefficients( IQMixers.T )
+    if suppress_leakage:
+        offsetI, offsetQ = IQMixers[:,2,newaxis], IQMixers[:,3,newaxis]
+    else:
+        offsetI, offsetQ = 0, 0
+
+    mixed = exp( 2j *pi *freqs_IF[:,newaxis] *arange(offset, offset+points) )
+    mixed *= envelopes_RF
+    return _mix_phasor( mixed, coefficient_I[:,newaxis], coefficient_Q[:,newaxis], offsetI, offsetQ, out )
+
+
+@instrumented("upconversion")
+def upConversion_RF ( I:ndarray, Q:ndarray, LOFreq:float, IQMixer:tuple=(1,90,0,0), offset:int = 0 )->ndarray:
+    """
+    IFFreq unit is 1/dt of envelope_RF\n
+    offset: index of the first point, keep the LO phase continuous for chunks of a long signal.
+    """
+    points = I.shape[-1]
     ampBalance = IQMixer[0]
     phaseBalance = IQMixer[1]
     offsetI = IQMixer[2]
     offsetQ = IQMixer[3]
-    mixed_I = (I+offsetI)*cos( 2.*pi*LOFreq*time )
-    mixed_Q = (Q+offsetQ)*ampBalance*cos( 2.*pi*LOFreq*time +radians(phaseBalance)) 
+    mixed_I = (I+offsetI)*give_cos( LOFreq, points, offset=offset )
+    mixed_Q = (Q+offsetQ)*ampBalance*give_cos( LOFreq, points, radians(phaseBalance), offset )
     signal_RF = mixed_I+mixed_Q
     return signal_RF
+
+
+def give_demodulationMatrix( freqs_IF:ndarray, points:int, weights:ndarray = None, offset:int = 0, isComplex:bool = False )->ndarray:
+    """
+    The reference matrix (points, frequencies) of downConversion, w[k,n] *exp( -2 pi i f_k n ).\n
+    weights: integration weights in shape (points,) or (frequencies, points),
+    default is 2/points for real records (1/points for complex records).
+    """
+    freqs_IF = atleast_1d( asarray(freqs_IF, dtype=float) )
+    reference = empty( (freqs_IF.shape[0], points), dtype=complex )
+    for index, freq in enumerate(freqs_IF):
+        # the cached table is read only
+        reference[index] = give_phasor( freq, points, offset=offset )
+    reference.imag *= -1
+    if weights is None:
+        reference *= (1. if isComplex else 2.) /points
+    else:
+        reference *= broadcast_to( weights, reference.shape )
+    return reference.T
+
+@instrumented("downconversion")
+def downConversion( records:ndarray, freqs_IF, weights:ndarray = None, offset:int = 0, blockShots:int = DEMOD_BLOCK_SHOTS, out:ndarray = None )->ndarray:
+    """
+    Demodulate records to complex IQ points, sum_n w[k,n] *record[n] *exp( -2 pi i f_k (n+offset) ).\n
+    records: shape (shots, points) or (points,), real (e.g. I or RF) or complex (I+iQ)\n
+    freqs_IF: a frequency or frequencies, unit is 1/dt of records\n
+    weights: integration weights in shape (points,) or (frequencies, points), real or complex,
+    default is 2/points (1/points for complex records) so A cos( 2 pi f n +phi ) is demodulated to A exp(i phi).\n
+    blockShots: shots in one matrix product\n
+    out: contiguous complex buffer in shape of the result\n
+    Return shape (shots, frequencies), the frequency axis is dropped if freqs_IF is a number.
+    """
+    records = asarray(records)
+    single = records.ndim == 1
+    if single: records = records[newaxis]
+    shots, points = records.shape
+    isComplex = iscomplexobj(records)
+    reference = give_demodulationMatrix( freqs_IF, points, weights, offset, isComplex )
+    frequencies = reference.shape[1]
+
+    if out is None:
+        buffer = empty( (shots, frequencies), dtype=complex )
+    elif out.dtype != complex or not out.flags.c_contiguous or out.size != shots*frequencies:
+        raise ValueError("out buffer should be a contiguous complex array in shape of the result")
+    else:
+        buffer = out.reshape( shots, frequencies )
+    if isComplex:
+        for start in range(0, shots, blockShots):
+            matmul( records[start:start+blockShots], reference, out=buffer[start:start+blockShots] )
+    else:
+        # real and imaginary parts in one real product, written directly into the complex output
+        stacked = empty( (points, frequencies, 2) )
+        stacked[...,0] = reference.real
+        stacked[...,1] = reference.imag
+        stacked = stacked.reshape( points, 2*frequencies )
+        bufferReal = buffer.view(float)
+        for start in range(0, shots, blockShots):
+            matmul( records[start:start+blockShots], stacked, out=bufferReal[start:start+blockShots] )
+
+    if out is not None: return out
+    if ndim(freqs_IF) == 0: buffer = buffer[:,0]
+    if single: buffer = buffer[0]
+    return buffer
@@ -0,0 +1,114 @@
+# Numpy
+# Typing
+from numpy import ndarray
+
+from typing import Callable, Hashable
+from collections import OrderedDict
+from threading import Lock
+
+
+class EnvelopeCache():
+    """
+    Least recently used store of envelope arrays.\n
+    maxEntries: The maximum number of stored envelopes\n
+    maxBytes: The maximum total size of stored envelopes\n
+    Stored arrays are set read only since they are shared by every pulse with the same key.\n
+    The store is locked, so the cache can be shared by threads (e.g. the render thread of pipeline).
+    """
+    def __init__ ( self, maxEntries:int=256, maxBytes:int=64*2**20 ):
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self._store = OrderedDict()
+        self._lock = Lock()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def nbytes ( self )->int:
+        """ Total size of stored envelopes."""
+        return self._nbytes
+
+    def __len__ ( self )->int:
+        return len(self._store)
+
+    def get( self, key:Hashable )->ndarray:
+        """ Return the stored envelope, None if the key is not stored."""
+        with self._lock:
+            envelope = self._store.get(key)
+            if envelope is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._store.move_to_end(key)
+        return envelope
+
+    def put( self, key:Hashable, envelope:ndarray )->ndarray:
+        """ Store the envelope and return it as read only array."""
+        envelope.flags.writeable = False
+        if envelope.nbytes > self.maxBytes:
+            return envelope
+        with self._lock:
+            if key in self._store:
+                self._nbytes -= self._store.pop(key).nbytes
+            self._store[key] = envelope
+            self._nbytes += envelope.nbytes
+            while len(self._store) > self.maxEntries or self._nbytes > self.maxBytes:
+                _, evicted = self._store.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+                self.evictions += 1
+        return envelope
+
+    def clear( self ):
+        """ Remove all stored envelopes and reset statistics."""
+        with self._lock:
+            self._store.clear()
+            self._nbytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def give_statistics( self )->dict:
+        """ Return hits, misses, evictions, entries and bytes of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._store),
+                "bytes": self._nbytes,
+            }
+
+
+def give_envelopeKey( envelopeFunc:Callable, parameters, duration:float, dt:float, t0:float, carrierPhase:float )->Hashable:
+    """
+    Key for the envelope formed by given settings, None if the settings are not hashable (e.g. array parameters).
+    """
+    try:
+        key = (envelopeFunc, tuple(parameters), duration, dt, t0, carrierPhase)
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+# Opt-in cache shared by Pulse.generate_envelope
+_activeCache = None
+
+def enable_envelopeCache( maxEntries:int=256, maxBytes:int=64*2**20 )->EnvelopeCache:
+    """
+    Start to reuse envelopes formed by Pulse.generate_envelope, return the cache.
+    """
+    global _activeCache
+    _activeCache = EnvelopeCache(maxEntries, maxBytes)
+    return _activeCache
+
+def disable_envelopeCache():
+    """ Stop to reuse envelopes and drop the cache."""
+    global _activeCache
+    _activeCache = None
+
+def give_envelopeCache()->EnvelopeCache:
+    """ Return the cache used by Pulse.generate_envelope, None if it is disabled."""
+    return _activeCache
@@ -0,0 +1,221 @@
+# Numpy
+# Typing
+from numpy import ndarray, complex128
+# Array
+from numpy import zeros, arange
+# Math
+from numpy import exp, ceil
+
+from typing import List, Tuple
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from .waveform import Waveform
+from .pulse import Pulse, QAM, give_envelopeValues
+
+# Tolerance (in points) to decide a time is on the evaluation grid
+GRID_TOLERANCE = 1e-9
+# Points calculated at once when the tail of a pulse is searched
+TAIL_CHUNK_POINTS = 256
+
+
+def _give_gridRange( tStart:float, tStop:float, t0:float, dt:float, points:int )->Tuple[int,int]:
+    """ Index range [k0, k1) of grid t0 +k*dt ( 0<=k<points ) inside [tStart, tStop)."""
+    k0 = int(ceil( (tStart -t0) /dt -GRID_TOLERANCE ))
+    k1 = int(ceil( (tStop -t0) /dt -GRID_TOLERANCE ))
+    if k0 < 0: k0 = 0
+    if k1 > points: k1 = points
+    if k1 < k0: k1 = k0
+    return k0, k1
+
+
+class PulseExpression( ABC ):
+    """
+    Lazy composition of pulses and waveforms, nothing is calculated until a time window is evaluated.\n
+    Expressions are combined by +, scalar *, shift (time delay) and rotate (phase rotation).
+    """
+    @property
+    @abstractmethod
+    def support ( self )->Tuple[float,float]:
+        """ Time range [start, stop) out of which the expression is zero."""
+
+    @abstractmethod
+    def _accumulate( self, out:ndarray, t0:float, dt:float, factor:complex ):
+        """ Add factor *expression on the grid t0 +k*dt to out."""
+
+    def evaluate( self, tStart:float, tStop:float, dt:float )->Waveform:
+        """
+        Calculate the expression in time window [tStart, tStop) with step dt,
+        only the terms overlapped with the window are calculated on their own points.
+        """
+        points = int( -((tStop -tStart) //-dt) )
+        out = zeros(points, dtype=complex128)
+        self._accumulate( out, tStart, dt, 1 )
+        return Waveform(tStart, dt, out)
+
+    def shift( self, time:float ):
+        """ Delay the expression by time."""
+        return Shift( self, time )
+
+    def rotate( self, phase:float ):
+        """ Multiply the expression by exp(i phase)."""
+        return Scale( self, exp(1j*phase) )
+
+    def __add__ ( self, other ):
+        if not isinstance(other, PulseExpression): return NotImplemented
+        return Sum( [self, other] )
+
+    def __radd__ ( self, other ):
+        if isinstance(other, (int,float)) and other == 0:  # sum() starts from 0
+            return self
+        return NotImplemented
+
+    def __mul__ ( self, factor:complex ):
+        if isinstance(factor, PulseExpression): return NotImplemented
+        return Scale( self, factor )
+
+    __rmul__ = __mul__
+
+    def __neg__ ( self ):
+        return Scale( self, -1 )
+
+    def __sub__ ( self, other ):
+        return self +(-other)
+
+
+class PulseTerm( PulseExpression ):
+    """ The envelope of a pulse starting at startTime."""
+    def __init__ ( self, pulse:Pulse, dt:float, startTime:float=0 ):
+        self.pulse = pulse
+        self.dt = dt
+        self.startTime = startTime
+        self.points = int( -(pulse.duration //-dt) )
+
+    @property
+    def support ( self )->Tuple[float,float]:
+        return self.startTime, self.startTime +self.points*self.dt
+
+    def _accumulate( self, out:ndarray, t0:float, dt:float, factor:complex ):
+        tStart, tStop = self.support
+        k0, k1 = _give_gridRange( tStart, tStop, t0, dt, out.shape[0] )
+        if k0 == k1: return
+        offset = (t0 -self.startTime) /dt
+        if dt == self.dt and abs(offset -round(offset)) < GRID_TOLERANCE:
+            # window grid is the pulse grid
+            pointStart = k0 +int(round(offset))
+            values = self.pulse.generate_envelope_range( 0, self.dt, pointStart, pointStart +k1 -k0 ).Y
+        else:
+            values = self._give_envelope( t0 +arange(k0, k1)*dt -self.startTime )
+        window = out[k0:k1]
+        window += factor *values
+
+    def _give_envelope( self, localTime:ndarray )->ndarray:
+        # gate time of the whole envelope, same as Pulse.generate_envelope_range
+        values = give_envelopeValues( self.pulse.envelopeFunc, localTime, self.pulse.parameters, (self.points-1) *self.dt )
+        return exp(1j*self.pulse.carrierPhase) *values
+
+
+class WaveformTerm( PulseExpression ):
+    """ A rendered waveform, it can only be evaluated on its own grid."""
+    def __init__ ( self, waveform:Waveform ):
+        self.waveform = waveform
+
+    @property
+    def support ( self )->Tuple[float,float]:
+        return self.waveform.x0, self.waveform.x0 +self.waveform.points*self.waveform.dx
+
+    def _accumulate( self, out:ndarray, t0:float, dt:float, factor:complex ):
+        if dt != self.waveform.dx:
+            raise ValueError("dx are different")
+        offset = (t0 -self.waveform.x0) /dt
+        if abs(offset -round(offset)) >= GRID_TOLERANCE:
+            raise ValueError("Waveform points are not on the evaluation grid")
+        tStart, tStop = self.support
+        k0, k1 = _give_gridRange( tStart, tStop, t0, dt, out.shape[0] )
+        if k0 == k1: return
+        pointStart = k0 +int(round(offset))
+        window = out[k0:k1]
+        window += factor *self.waveform.Y[pointStart:pointStart+k1-k0]
+
+
+class Shift( PulseExpression ):
+    def __init__ ( self, term:PulseExpression, time:float ):
+        self.term = term
+        self.time = time
+
+    @property
+    def support ( self )->Tuple[float,float]:
+        tStart, tStop = self.term.support
+        return tStart +self.time, tStop +self.time
+
+    def _accumulate( self, out:ndarray, t0:float, dt:float, factor:complex ):
+        self.term._accumulate( out, t0 -self.time, dt, factor )
+
+
+class Scale( PulseExpression ):
+    def __init__ ( self, term:PulseExpression, factor:complex ):
+        self.term = term
+        self.factor = factor
+
+    @property
+    def support ( self )->Tuple[float,float]:
+        return self.term.support
+
+    def _accumulate( self, out:ndarray, t0:float, dt:float, factor:complex ):
+        self.term._accumulate( out, t0, dt, factor *self.factor )
+
+
+class Sum( PulseExpression ):
+    """
+    Sum of terms, the terms are kept sorted by support start
+    so a window only visits the terms near it.
+    """
+    def __init__ ( self, terms:List[PulseExpression] ):
+        self.terms = []
+        for term in terms:  # flatten nested sums
+            if isinstance(term, Sum): self.terms.extend( term.terms )
+            else: self.terms.append( term )
+        supports = [ term.support for term in self.terms ]
+        # (start, stop, order) by start, and the largest stop up to each of them
+        self._spans = sorted( (support[0], support[1], order) for order, support in enumerate(supports) )
+        self._starts = [ span[0] for span in self._spans ]
+        self._maxStops = []
+        for span in self._spans:
+            self._maxStops.append( span[1] if len(self._maxStops) == 0 or span[1] > self._maxStops[-1] else self._maxStops[-1] )
+
+    @property
+    def support ( self )->Tuple[float,float]:
+        """ Time range of all terms, (0, 0) if there is no term."""
+        if len(self._spans) == 0:
+            return 0., 0.
+        return self._starts[0], self._maxStops[-1]
+
+    def give_overlapped( self, tStart:float, tStop:float )->List[int]:
+        """ Index (in the order of terms) of the terms overlapped with [tStart, tStop)."""
+        # terms before first stop before tStart, terms from last start after tStop
+        first = bisect_right( self._maxStops, tStart )
+        last = bisect_left( self._starts, tStop )
+        return sorted( order for termStart, termStop, order in self._spans[first:last] if termStop > tStart )
+
+    def _accumulate( self, out:ndarray, t0:float, dt:float, factor:complex ):
+        tStop = t0 +out.shape[0]*dt
+        # add in the order of terms, same rounding as the whole sequence
+        for order in self.give_overlapped( t0, tStop ):
+            self.terms[order]._accumulate( out, t0, dt, factor )
+
+def as_expression( item, dt:float=1, startTime:float=0 )->PulseExpression:
+    """ Wrap a Pulse (starting at startTime) or a Waveform as a lazy expression."""
+    if isinstance(item, PulseExpression):
+        return item
+    if isinstance(item, Pulse):
+        return PulseTerm( item, dt, startTime )
+    if isinstance(item, Waveform):
+        return WaveformTerm( item ).shift( startTime ) if startTime != 0 else WaveformTerm( item )
+    raise TypeError("Only Pulse or Waveform can be a pulse expression")
+
+def give_sequenceExpression( pulses:List[Pulse], dt:float, totalPoints:int )->Sum:
+    """
+    The envelope sequence of QAM.give_RFenvelope_IFfrequency as a lazy expression.\n
+    No envelope is calculated except the tails of the pulses followed by a concatenated pulse (see QAM.give_startPoints).
+    """
+    startPoints = QAM( dt, totalPoints ).give_startPoints( pulses, chunkPoints=TAIL_CHUNK_POINTS )
+    return Sum( [ PulseTerm( pulse, dt, startPoint*dt ) for pulse, startPoint in zip(pulses, startPoints) ] )
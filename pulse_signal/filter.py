@@ -0,0 +1,196 @@
+# Numpy
+# Typing
+from numpy import ndarray, iscomplexobj, result_type
+# Array
+from numpy import zeros, asarray, array, convolve
+# Math
+from numpy import exp
+from numpy.fft import rfft, irfft, fft, ifft
+
+from typing import Iterable, Iterator, List, Tuple
+from .waveform import Waveform
+
+# Kernels not longer than this are convolved directly in "auto" method
+DIRECT_KERNEL_POINTS = 64
+
+
+class FIRFilter():
+    """
+    Causal FIR filter y[n] = sum_k kernel[k] x[n-k], the output has the length of input.\n
+    method: "direct" (numpy.convolve), "fft" (overlap-add) or "auto" (direct for short kernels)\n
+    fftPoints: FFT size of the overlap-add blocks (default is a power of two about 8 times the kernel)\n
+    apply() filters a whole signal, process() filters a stream chunk by chunk with the tail kept between chunks.
+    """
+    def __init__ ( self, kernel:ndarray, method:str="auto", fftPoints:int=None ):
+        if method not in ("auto", "direct", "fft"):
+            raise ValueError("method should be 'auto', 'direct' or 'fft'")
+        self.kernel = array(kernel)
+        if self.kernel.ndim != 1 or self.kernel.shape[0] == 0:
+            raise ValueError("kernel should be a non-empty 1D array")
+        points = self.kernel.shape[0]
+        if method == "auto":
+            method = "direct" if points <= DIRECT_KERNEL_POINTS else "fft"
+        self.method = method
+        if fftPoints == None:
+            fftPoints = 1024
+            while fftPoints < 8*points: fftPoints *= 2
+        if fftPoints < 2*points -1:
+            raise ValueError("fftPoints should be at least twice the kernel")
+        self.fftPoints = fftPoints
+        self._spectra = {}
+        self._tail = None
+
+    def _give_spectrum( self, fftPoints:int, isComplex:bool )->ndarray:
+        """ FFT of kernel in size fftPoints, cached for each size."""
+        key = (fftPoints, isComplex)
+        spectrum = self._spectra.get(key)
+        if spectrum is None:
+            spectrum = fft( self.kernel, fftPoints ) if isComplex else rfft( self.kernel, fftPoints )
+            self._spectra[key] = spectrum
+        return spectrum
+
+    def _convolve_fft( self, signal:ndarray, dataType )->ndarray:
+        """ Full convolution (length N+M-1) by overlap-add."""
+        points = signal.shape[0]
+        kernelPoints = self.kernel.shape[0]
+        fftPoints = self.fftPoints
+        # short signal (e.g. a small chunk) is one block with a smaller FFT
+        if points +kernelPoints -1 < fftPoints:
+            fftPoints = 1
+            while fftPoints < points +kernelPoints -1: fftPoints *= 2
+        blockPoints = fftPoints -kernelPoints +1
+        blocks = -(points //-blockPoints)
+
+        isComplex = iscomplexobj(signal) or iscomplexobj(self.kernel)
+        spectrum = self._give_spectrum( fftPoints, isComplex )
+        padded = zeros( (blocks, blockPoints), dtype=signal.dtype )
+        padded.reshape(-1)[:points] = signal
+        if isComplex:
+            convolved = ifft( fft( padded, fftPoints, axis=1 ) *spectrum, axis=1 )
+        else:
+            convolved = irfft( rfft( padded, fftPoints, axis=1 ) *spectrum, fftPoints, axis=1 )
+
+        # each block overlaps only the next one since blockPoints >= kernelPoints-1
+        full = zeros( (blocks+1)*blockPoints +kernelPoints, dtype=dataType )
+        full[:blocks*blockPoints] = convolved[:,:blockPoints].reshape(-1)
+        overlap = full[blockPoints:(blocks+1)*blockPoints].reshape(blocks, blockPoints)
+        if kernelPoints -1 <= blockPoints:
+            overlap[:,:kernelPoints-1] += convolved[:,blockPoints:blockPoints+kernelPoints-1]
+        else:  # single block
+            full[blockPoints:blockPoints+kernelPoints-1] += convolved[0,blockPoints:blockPoints+kernelPoints-1]
+        return full[:points +kernelPoints -1]
+
+    def _convolve( self, signal:ndarray )->ndarray:
+        dataType = result_type( signal, self.kernel )
+        if signal.shape[0] == 0:
+            return zeros( self.kernel.shape[0]-1, dtype=dataType )
+        if self.method == "direct":
+            return convolve( signal, self.kernel ).astype(dataType, copy=False)
+        return self._convolve_fft( signal, dataType )
+
+    def apply( self, signal:ndarray )->ndarray:
+        """ Filter the whole signal (1D), the stream state is not used."""
+        signal = asarray(signal)
+        full = self._convolve( signal )
+        return full[:signal.shape[0]]
+
+    def process( self, chunk:ndarray )->ndarray:
+        """ Filter the next chunk of a stream, the chunks joined are the same as apply() on the whole stream."""
+        chunk = asarray(chunk)
+        if chunk.shape[0] == 0:
+            return chunk[:0].astype( result_type(chunk, self.kernel) )
+        full = self._convolve( chunk )
+        if self._tail is not None:
+            if full.dtype != result_type(full, self._tail):
+                full = full.astype( result_type(full, self._tail) )
+            full[:self._tail.shape[0]] += self._tail
+        self._tail = full[chunk.shape[0]:].copy()
+        return full[:chunk.shape[0]]
+
+    def reset( self ):
+        """ Clear the stream state."""
+        self._tail = None
+
+
+def give_exponentialSection( amplitude:float, tau:float, dt:float=1 )->ndarray:
+    """
+    The first-order IIR section (b0, b1, 0, 1, a1, 0) correcting the step response 1 +amplitude*exp(-t/tau),
+    it is the exact inverse of the sampled step response.\n
+    tau: time constant, unit depended on dt
+    """
+    decay = exp( -dt /tau )
+    if amplitude <= -1 or abs( (decay +amplitude) /(1 +amplitude) ) >= 1:
+        raise ValueError("Correction of amplitude %s is unstable" %amplitude)
+    return array([ 1/(1+amplitude), -decay/(1+amplitude), 0., 1., -(decay +amplitude)/(1+amplitude), 0. ])
+
+
+class IIRFilter():
+    """
+    Cascaded IIR sections in second-order form, each row is (b0, b1, b2, 1, a1, a2).\n
+    apply() filters a whole signal, process() filters a stream chunk by chunk with the state kept.\n
+    scipy.signal is imported on first use.
+    """
+    def __init__ ( self, sections:Iterable ):
+        self.sections = array(sections, dtype=float).reshape(-1, 6)
+        self._state = None
+
+    def _filter( self, signal:ndarray, state:ndarray )->Tuple[ndarray,ndarray]:
+        from scipy.signal import sosfilt
+        dataType = result_type( signal, self.sections )
+        if state.dtype != dataType: state = state.astype(dataType)
+        return sosfilt( self.sections, signal.astype(dataType, copy=False), zi=state )
+
+    def apply( self, signal:ndarray )->ndarray:
+        """ Filter the whole signal (1D) from zero state."""
+        signal = asarray(signal)
+        filtered, _ = self._filter( signal, zeros( (self.sections.shape[0], 2) ) )
+        return filtered
+
+    def process( self, chunk:ndarray )->ndarray:
+        """ Filter the next chunk of a stream."""
+        chunk = asarray(chunk)
+        if self._state is None: self._state = zeros( (self.sections.shape[0], 2) )
+        filtered, self._state = self._filter( chunk, self._state )
+        return filtered
+
+    def reset( self ):
+        """ Clear the stream state."""
+        self._state = None
+
+
+def get_ExponentialCorrection( corrections:List[Tuple[float,float]], dt:float=1 )->IIRFilter:
+    """ IIR filter correcting step response distortions (amplitude, tau) in cascade."""
+    return IIRFilter( [ give_exponentialSection( amplitude, tau, dt ) for amplitude, tau in corrections ] )
+
+
+class FilterChain():
+    """ Filters applied in order, e.g. exponential corrections then an FIR."""
+    def __init__ ( self, filters:list ):
+        self.filters = list(filters)
+
+    def apply( self, signal:ndarray )->ndarray:
+        for stage in self.filters:
+            signal = stage.apply( signal )
+        return signal
+
+    def process( self, chunk:ndarray )->ndarray:
+        for stage in self.filters:
+            chunk = stage.process( chunk )
+        return chunk
+
+    def reset( self ):
+        for stage in self.filters:
+            stage.reset()
+
+
+def iter_filtered( stage, chunks:Iterable )->Iterator:
+    """
+    Filter a stream of chunks (arrays or Waveform, e.g. QAM.iter_RFenvelope),
+    the state of stage is reset before the first chunk.
+    """
+    stage.reset()
+    for chunk in chunks:
+        if isinstance(chunk, Waveform):
+            yield Waveform( chunk.x0, chunk.dx, stage.process( chunk.Y ) )
+        else:
+            yield stage.process( chunk )
@@ -0,0 +1,79 @@
+# Numpy
+# Typing
+from numpy import ndarray, complex128
+# Array
+from numpy import zeros, array, concatenate
+
+from typing import Dict, Iterable, List
+from .pulse import Pulse
+
+
+class GateLibrary():
+    """
+    Envelopes of named gates rendered once at a fixed dt.\n
+    A sequence of gate names is compiled by copying the rendered envelopes back to back.
+    """
+    def __init__ ( self, dt:float=1 ):
+        self.dt = dt
+        self._envelopes = {}
+        self._carrierFrequencies = {}
+
+    def __contains__ ( self, name:str )->bool:
+        return name in self._envelopes
+
+    def __len__ ( self )->int:
+        return len(self._envelopes)
+
+    @property
+    def names ( self )->List[str]:
+        """ Names of the gates in library."""
+        return list(self._envelopes)
+
+    def add_gate( self, name:str, pulse:Pulse ):
+        """ Render the envelope of pulse and store it as gate name."""
+        self.add_envelope( name, pulse.generate_envelope( 0, self.dt ).Y, pulse.carrierFrequency )
+
+    def add_envelope( self, name:str, envelope:ndarray, carrierFrequency:float=None ):
+        """ Store a rendered envelope as gate name, e.g. an idle of zeros."""
+        envelope = array(envelope, dtype=complex128)
+        envelope.flags.writeable = False
+        self._envelopes[name] = envelope
+        self._carrierFrequencies[name] = carrierFrequency
+
+    def give_envelope( self, name:str )->ndarray:
+        """ The rendered envelope of gate name (read only)."""
+        return self._envelopes[name]
+
+    def give_carrierFrequency( self, name:str )->float:
+        """ The carrier frequency of gate name."""
+        return self._carrierFrequencies[name]
+
+    def give_points( self, names:Iterable[str] )->int:
+        """ The number of points of a sequence of gate names."""
+        return sum( self._envelopes[name].shape[0] for name in names )
+
+    def compile( self, names:Iterable[str], startPoint:int=0, totalPoints:int=None )->ndarray:
+        """
+        Return the envelope sequence of gate names placed back to back from startPoint.\n
+        totalPoints: length of the sequence, the gates must fit in it (default is just enough for the gates).
+        """
+        envelopes = [ self._envelopes[name] for name in names ]
+        gatePoints = sum( envelope.shape[0] for envelope in envelopes )
+        if totalPoints == None: totalPoints = startPoint +gatePoints
+        if startPoint < 0:
+            raise ValueError("negative dimensions are not allowed")
+        if startPoint +gatePoints > totalPoints:
+            raise IndexError("Pulse is out of given total time !")
+
+        sequence = zeros(totalPoints, dtype=complex128)
+        if len(envelopes) > 0:
+            concatenate( envelopes, out=sequence[startPoint:startPoint+gatePoints] )
+        return sequence
+
+
+def get_GateLibrary( gates:Dict[str,Pulse], dt:float=1 )->GateLibrary:
+    """ Get a GateLibrary with the pulse of each gate name rendered."""
+    library = GateLibrary( dt )
+    for name, pulse in gates.items():
+        library.add_gate( name, pulse )
+    return library
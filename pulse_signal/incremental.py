@@ -0,0 +1,101 @@
+# Numpy
+# Typing
+from numpy import nan
+# Array
+from numpy import array
+
+from typing import List, Tuple
+from .pulse import Pulse
+from .assembly import EnvelopeAssembler, last_nonzero
+from .digital_mixer import upConversion_IQ
+
+
+class IncrementalSequence():
+    """
+    A pulse sequence assembled once (same as QAM.give_RFenvelope_IFfrequency and QAM.SSB),
+    then only the span of a changed pulse is calculated again.\n
+    freqIF: IF frequency (unit is 1/dt), I/Q are not calculated if it is None\n
+    fast: I/Q by upConversion_IQ fast mode, the updated spans are then the same within floating point tolerance
+    (bit-identical to a full pass otherwise)\n
+    Overlapped pulses are assumed not to cancel each other exactly at the tail of sequence.
+    """
+    def __init__ ( self, pulses:List[Pulse], dt:float=1, totalPoints:int=1, freqIF:float=None, IQMixer:tuple=(1,90,0,0), fast:bool=False ):
+        self.pulses = list(pulses)
+        self.dt = dt
+        self.totalPoints = totalPoints
+        self.freqIF = freqIF
+        self.IQMixer = IQMixer
+        self.fast = fast
+        self.rebuild()
+
+    @property
+    def spans ( self )->List[Tuple[int,int]]:
+        """ [start, end) of each pulse in the sequence."""
+        return [ (int(start), int(end)) for start, end in zip(self._starts, self._ends) ]
+
+    @property
+    def freq_LO ( self )->float:
+        """ LO frequency (RF-IF) by the carrier frequency of the last pulse, nan if it is not given."""
+        if self.freqIF == None or len(self.pulses) == 0 or self.pulses[-1].carrierFrequency == None:
+            return nan
+        return self.pulses[-1].carrierFrequency -self.freqIF
+
+    def rebuild( self ):
+        """ Assemble the whole sequence and its I/Q."""
+        assembler = EnvelopeAssembler( self.totalPoints )
+        self._envelopes = []
+        self._startSettings = []
+        starts = []
+        for pulse in self.pulses:
+            envelope = pulse.generate_envelope( 0, self.dt ).Y
+            starts.append( assembler.add( envelope, pulse.startPoint ) )
+            self._envelopes.append( envelope )
+            self._startSettings.append( pulse.startPoint )
+        self._starts = array(starts, dtype=int)
+        self._ends = self._starts +array([ envelope.shape[0] for envelope in self._envelopes ], dtype=int)
+        self.envelope = assembler.buffer
+        if self.freqIF == None:
+            self.signal_I, self.signal_Q = None, None
+        else:
+            self.signal_I, self.signal_Q = upConversion_IQ( self.envelope, self.freqIF*self.dt, IQMixer=self.IQMixer, fast=self.fast )
+
+    def update( self, index:int, parameters:tuple=None, carrierPhase:float=None )->Tuple[int,int]:
+        """ Change the parameters or carrier phase of pulse index, see refresh."""
+        if parameters != None: self.pulses[index].parameters = parameters
+        if carrierPhase != None: self.pulses[index].carrierPhase = carrierPhase
+        return self.refresh( index )
+
+    def refresh( self, index:int )->Tuple[int,int]:
+        """
+        Calculate pulse index again after its settings are changed, only its span of envelope and I/Q is updated.\n
+        The whole sequence is rebuilt if the start points of pulses can move,
+        i.e. the length or the start setting of pulse changes, or a later concatenated pulse follows a different tail.\n
+        Return the updated span [start, end).
+        """
+        pulse = self.pulses[index]
+        envelope = pulse.generate_envelope( 0, self.dt ).Y
+        previous = self._envelopes[index]
+        moved = envelope.shape[0] != previous.shape[0] or pulse.startPoint != self._startSettings[index]
+        if not moved and last_nonzero(envelope) != last_nonzero(previous):
+            moved = any( startPoint == "" for startPoint in self._startSettings[index+1:] )
+        if moved:
+            self.rebuild()
+            return 0, self.totalPoints
+
+        self._envelopes[index] = envelope
+        start, end = int(self._starts[index]), int(self._ends[index])
+        # sum the pulses overlapped with the span again in the original order
+        window = self.envelope[start:end]
+        window[:] = 0
+        for other in ( (self._starts < end) & (self._ends > start) ).nonzero()[0]:
+            otherStart, otherEnd = int(self._starts[other]), int(self._ends[other])
+            cutStart = otherStart if otherStart > start else start
+            cutEnd = otherEnd if otherEnd < end else end
+            window[cutStart-start:cutEnd-start] += self._envelopes[other][cutStart-otherStart:cutEnd-otherStart]
+
+        if self.freqIF != None:
+            # absolute index of span keeps the IF phase
+            signal_I, signal_Q = upConversion_IQ( window, self.freqIF*self.dt, IQMixer=self.IQMixer, fast=self.fast, offset=start )
+            self.signal_I[start:end] = signal_I
+            self.signal_Q[start:end] = signal_Q
+        return start, end
@@ -0,0 +1,163 @@
+# Numpy
+# Typing
+from numpy import ndarray
+
+from typing import Callable, Dict, List
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+from .waveform import Waveform
+
+
+class StageStatistics():
+    """
+    Counters of one stage.\n
+    calls: number of calls\n
+    samples: number of samples in the returned arrays\n
+    nbytes: bytes of the returned arrays\n
+    time: wall time in second, including nested stages
+    """
+    __slots__ = ("calls", "samples", "nbytes", "time")
+
+    def __init__ ( self ):
+        self.calls = 0
+        self.samples = 0
+        self.nbytes = 0
+        self.time = 0.
+
+    def as_dict( self )->Dict[str,float]:
+        return { "calls": self.calls, "samples": self.samples, "nbytes": self.nbytes, "time": self.time }
+
+    def __repr__ ( self ):
+        return "StageStatistics(calls=%d, samples=%d, nbytes=%d, time=%.6f)" %(self.calls, self.samples, self.nbytes, self.time)
+
+
+class Collector():
+    """
+    Collect per-stage counters of the calls made while it is active.\n
+    with Collector() as collector:\n
+        ...\n
+    collector.statistics["envelope"].time\n
+    Stages: parse, envelope, assembly, upconversion, downconversion, quantize, export
+    """
+    def __init__ ( self ):
+        self.statistics = {}
+        self._lock = Lock()
+
+    def record( self, stage:str, seconds:float, samples:int, nbytes:int ):
+        with self._lock:
+            statistics = self.statistics.get(stage)
+            if statistics == None:
+                statistics = self.statistics[stage] = StageStatistics()
+            statistics.calls += 1
+            statistics.samples += samples
+            statistics.nbytes += nbytes
+            statistics.time += seconds
+
+    def give_statistics( self )->Dict[str,Dict[str,float]]:
+        """ The counters of each stage as plain dictionaries, e.g. to push into metrics."""
+        with self._lock:
+            return { stage: statistics.as_dict() for stage, statistics in self.statistics.items() }
+
+    def give_report( self )->str:
+        """ The counters of each stage as a text table."""
+        lines = [ "%-14s %8s %12s %14s %12s" %("stage", "calls", "samples", "bytes", "time (s)") ]
+        for stage, statistics in self.give_statistics().items():
+            lines.append( "%-14s %8d %12d %14d %12.6f" %(stage, statistics["calls"], statistics["samples"], statistics["nbytes"], statistics["time"]) )
+        return "\n".join(lines)
+
+    def reset( self ):
+        with self._lock:
+            self.statistics = {}
+
+    def start( self ):
+        """ Start collecting (same as entering the context)."""
+        with _registryLock:
+            if self not in _collectors: _collectors.append(self)
+            _update_enabled()
+        return self
+
+    def stop( self ):
+        """ Stop collecting, the counters are kept."""
+        with _registryLock:
+            if self in _collectors: _collectors.remove(self)
+            _update_enabled()
+
+    def __enter__ ( self ):
+        return self.start()
+
+    def __exit__ ( self, *exc ):
+        self.stop()
+
+
+# Active collectors and hooks, instrumented functions only check _enabled when nothing is active
+_collectors = []
+_hooks = []
+_enabled = False
+_registryLock = Lock()
+
+def _update_enabled():
+    global _enabled
+    _enabled = len(_collectors) > 0 or len(_hooks) > 0
+
+def add_hook( callback:Callable[[str,str,float,int,int],None] ):
+    """
+    Call callback( stage, name, seconds, samples, nbytes ) after every instrumented call,
+    name is the qualified name of the function.
+    """
+    with _registryLock:
+        _hooks.append(callback)
+        _update_enabled()
+
+def remove_hook( callback:Callable[[str,str,float,int,int],None] ):
+    with _registryLock:
+        if callback in _hooks: _hooks.remove(callback)
+        _update_enabled()
+
+def is_enabled()->bool:
+    """ True if any collector or hook is active."""
+    return _enabled
+
+
+def give_size( result )->tuple:
+    """ (samples, bytes) of the arrays in result (array, Waveform or a tuple/list of them)."""
+    if isinstance(result, ndarray):
+        return result.size, result.nbytes
+    if isinstance(result, Waveform):
+        return give_size( result.Y )
+    if isinstance(result, (tuple, list)):
+        samples, nbytes = 0, 0
+        for item in result:
+            if isinstance(item, (ndarray, Waveform)):
+                itemSamples, itemBytes = give_size( item )
+                samples += itemSamples
+                nbytes += itemBytes
+        return samples, nbytes
+    return 0, 0
+
+def record( stage:str, name:str, seconds:float, samples:int=0, nbytes:int=0 ):
+    """ Add a call of stage to the active collectors and hooks."""
+    for collector in list(_collectors):
+        collector.record( stage, seconds, samples, nbytes )
+    for hook in list(_hooks):
+        hook( stage, name, seconds, samples, nbytes )
+
+def instrumented( stage:str ):
+    """
+    Decorator counting the calls of a function as stage,
+    the function is called directly when no collector or hook is active.
+    """
+    def decorator( func:Callable )->Callable:
+        name = func.__qualname__
+        @wraps(func)
+        def wrapper( *args, **kwargs ):
+            if not _enabled:
+                return func( *args, **kwargs )
+            start = perf_counter()
+            result = func( *args, **kwargs )
+            seconds = perf_counter() -start
+            samples, nbytes = give_size( result )
+            record( stage, name, seconds, samples, nbytes )
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,97 @@
+# Numpy
+# Typing
+from numpy import ndarray
+# Array
+from numpy import arange, resize
+# Math
+from numpy import exp, cos
+# const
+from numpy import pi
+
+from fractions import Fraction
+from .envelope_cache import EnvelopeCache
+
+
+class NCOCache( EnvelopeCache ):
+    """
+    Numerically controlled oscillator (NCO) tables, stored with least recently used eviction.\n
+    Tables are keyed by (normalized frequency, points, phase), the frequency unit is 1/dt.\n
+    maxPeriod: If frequency is p/q with q <= maxPeriod (within phase error tolerance),
+    only one period of q points is calculated and tiled to the table length.
+    """
+    def __init__ ( self, maxEntries:int=64, maxBytes:int=64*2**20, maxPeriod:int=4096, tolerance:float=1e-10 ):
+        super().__init__(maxEntries, maxBytes)
+        self.maxPeriod = maxPeriod
+        self.tolerance = tolerance
+
+    def give_period( self, freq:float, points:int )->Fraction:
+        """
+        Return freq as fraction p/q if the table of given points can be tiled by the period q, else None.
+        """
+        ratio = Fraction(float(freq)).limit_denominator(self.maxPeriod)
+        if ratio.denominator >= points:
+            return None
+        # accumulated phase error at the end of table
+        if 2.*pi *abs(float(freq) -float(ratio)) *points > self.tolerance:
+            return None
+        return ratio
+
+    def give_phasor( self, freq:float, points:int, phase:float=0. )->ndarray:
+        """ exp( i(2 pi freq n +phase) ) for n in [0, points), read only."""
+        return self._give_table( "phasor", freq, points, phase )
+
+    def give_cos( self, freq:float, points:int, phase:float=0. )->ndarray:
+        """ cos( 2 pi freq n +phase ) for n in [0, points), read only."""
+        return self._give_table( "cos", freq, points, phase )
+
+    def _give_table( self, kind:str, freq:float, points:int, phase:float )->ndarray:
+        key = (kind, freq, points, phase)
+        table = self.get(key)
+        if table is None:
+            ratio = self.give_period( freq, points )
+            if ratio == None:
+                table = self._calculate( kind, 2.*pi *freq *arange(points), phase )
+            else:  # exact phase of one period
+                index = arange(ratio.denominator)
+                period = self._calculate( kind, 2.*pi *((index *ratio.numerator) %ratio.denominator) /ratio.denominator, phase )
+                table = resize( period, points )
+            table = self.put( key, table )
+        return table
+
+    @staticmethod
+    def _calculate( kind:str, theta:ndarray, phase:float )->ndarray:
+        if kind == "phasor":
+            return exp( 1j *(theta +phase) )
+        else:
+            return cos( theta +phase )
+
+
+# Shared by digital_mixer and Pulse
+_ncoCache = NCOCache()
+
+def give_ncoCache()->NCOCache:
+    """ Return the NCO table cache used by the mixers, None if it is disabled."""
+    return _ncoCache
+
+def set_ncoCache( cache:NCOCache ):
+    """ Replace the NCO table cache used by the mixers, None to disable it."""
+    global _ncoCache
+    _ncoCache = cache
+
+def give_phasor( freq:float, points:int, phase:float=0., offset:int=0 )->ndarray:
+    """
+    exp( i(2 pi freq n +phase) ) for n in [offset, offset+points) from the shared cache,\n
+    tables with nonzero offset (e.g. chunks of a stream) are calculated directly.
+    """
+    if _ncoCache is None or offset != 0:
+        return exp( 1j *(2.*pi *freq *arange(offset, offset+points) +phase) )
+    return _ncoCache.give_phasor( freq, points, phase )
+
+def give_cos( freq:float, points:int, phase:float=0., offset:int=0 )->ndarray:
+    """
+    cos( 2 pi freq n +phase ) for n in [offset, offset+points) from the shared cache,\n
+    tables with nonzero offset (e.g. chunks of a stream) are calculated directly.
+    """
+    if _ncoCache is None or offset != 0:
+        return cos( 2.*pi *freq *arange(offset, offset+points) +phase )
+    return _ncoCache.give_cos( freq, points, phase )
@@ -0,0 +1,153 @@
+# Numpy
+# Typing
+from numpy import ndarray, nan
+
+from typing import Callable, Iterable, List
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from .pulse import Pulse, QAM
+from .waveform import Waveform
+from .waveform_file import save_waveform, save_channels
+
+
+class RenderedShot():
+    """
+    The waveforms of one shot.\n
+    envelope: RF envelope sequence\n
+    signal_I, signal_Q: None if the shot is not up-converted\n
+    freq_LO: LO frequency (RF-IF), nan if it is not given
+    """
+    __slots__ = ("index", "envelope", "signal_I", "signal_Q", "freq_LO", "dt")
+
+    def __init__ ( self, index:int, envelope:ndarray, signal_I:ndarray=None, signal_Q:ndarray=None, freq_LO:float=nan, dt:float=1 ):
+        self.index = index
+        self.envelope = envelope
+        self.signal_I = signal_I
+        self.signal_Q = signal_Q
+        self.freq_LO = freq_LO
+        self.dt = dt
+
+
+class SequenceRenderer():
+    """
+    Render the pulse sequence of a shot by QAM.give_RFenvelope_IFfrequency, and QAM.SSB if freqIF is given.
+    """
+    def __init__ ( self, totalPoints:int, dt:float=1, freqIF:float=None, IQMixer:tuple=(1,90,0,0) ):
+        self.totalPoints = totalPoints
+        self.dt = dt
+        self.freqIF = freqIF
+        self.IQMixer = IQMixer
+
+    def __call__ ( self, index:int, pulses:List[Pulse] )->RenderedShot:
+        qam = QAM( self.dt, self.totalPoints )
+        _, envelope = qam.give_RFenvelope_IFfrequency( pulses )
+        shot = RenderedShot( index, envelope, dt=self.dt )
+        if self.freqIF != None:
+            SSBResult = qam.SSB( self.freqIF, envelope, IQMixer=self.IQMixer )
+            shot.signal_I, shot.signal_Q = SSBResult[0], SSBResult[1]
+            if len(SSBResult) == 3: shot.freq_LO = SSBResult[2]
+        return shot
+
+
+class WaveformSink( ABC ):
+    """ Consumer of the rendered shots, e.g. an instrument upload."""
+    @abstractmethod
+    async def send( self, shot:RenderedShot ):
+        """ Consume one shot, awaited in the order of the shots."""
+
+    async def close( self ):
+        pass
+
+
+class FileSink( WaveformSink ):
+    """
+    Write each shot to a waveform file in directory, I/Q as two channels or the envelope if there is no I/Q.\n
+    The files are written in a thread, the event loop is not blocked.
+    """
+    def __init__ ( self, directory:str, pattern:str="shot_%06d.pswf" ):
+        self.directory = directory
+        self.pattern = pattern
+        self.paths = []
+        os.makedirs( directory, exist_ok=True )
+
+    def _write( self, shot:RenderedShot, path:str ):
+        if shot.signal_I is None:
+            save_waveform( path, Waveform(0, shot.dt, shot.envelope) )
+        else:
+            save_channels( path, (shot.signal_I, shot.signal_Q), 0, shot.dt )
+
+    async def send( self, shot:RenderedShot ):
+        path = os.path.join( self.directory, self.pattern %shot.index )
+        await asyncio.to_thread( self._write, shot, path )
+        self.paths.append( path )
+
+
+class FakeInstrumentSink( WaveformSink ):
+    """
+    In-memory instrument for offline tests, it keeps the received shots.\n
+    uploadTime: seconds each upload takes
+    """
+    def __init__ ( self, uploadTime:float=0 ):
+        self.uploadTime = uploadTime
+        self.shots = []
+        self.closed = False
+
+    async def send( self, shot:RenderedShot ):
+        if self.closed:
+            raise RuntimeError("Instrument is closed")
+        if self.uploadTime > 0:
+            await asyncio.sleep( self.uploadTime )
+        self.shots.append( shot )
+
+    async def close( self ):
+        self.closed = True
+
+
+# Marks the end of rendered shots in queue
+_END = object()
+
+async def run_pipeline( sequences:Iterable, sink:WaveformSink, render:Callable, queueSize:int=1 )->int:
+    """
+    Render shot N+1 in a worker thread while shot N is sent to sink.\n
+    sequences: the job of each shot, render( index, job ) returns a RenderedShot (e.g. SequenceRenderer with pulse lists)\n
+    queueSize: rendered shots waiting for sink, rendering waits when the queue is full\n
+    Shots are sent in order. If rendering or sink fails, or the pipeline is cancelled, the other side is cancelled,
+    sink is closed and the error is raised. A render already running in the thread finishes in background.\n
+    The envelope and NCO caches are locked, render can use them while the main thread does.\n
+    Return the number of shots sent.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue( maxsize=queueSize )
+    executor = ThreadPoolExecutor( max_workers=1, thread_name_prefix="pulse_signal-render" )
+    sent = 0
+
+    async def produce():
+        for index, job in enumerate(sequences):
+            shot = await loop.run_in_executor( executor, render, index, job )
+            await queue.put( shot )
+        await queue.put( _END )
+
+    async def consume():
+        nonlocal sent
+        while True:
+            shot = await queue.get()
+            if shot is _END: return
+            await sink.send( shot )
+            sent += 1
+
+    producer = asyncio.ensure_future( produce() )
+    consumer = asyncio.ensure_future( consume() )
+    try:
+        done, _ = await asyncio.wait( (producer, consumer), return_when=asyncio.FIRST_EXCEPTION )
+        for task in done:
+            task.result()  # raise the error of a failed side
+        await consumer
+    finally:
+        for task in (producer, consumer):
+            if not task.done(): task.cancel()
+        await asyncio.gather( producer, consumer, return_exceptions=True )
+        executor.shutdown( wait=False, cancel_futures=True )
+        await sink.close()
+    return sent
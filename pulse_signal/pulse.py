@@ -4,32 +4,50 @@
 # Typing
 from numpy import ndarray, complex128, issubdtype, nan, isnan
 # Array
-from numpy import array, linspace, empty, append, zeros, hstack, nonzero
+from numpy import array, linspace, empty, append, zeros, hstack, asarray, broadcast_to, newaxis, ndim, arange
 # Math
-from numpy import cos, sin, exp, arctan2, radians, sign, sqrt, max
+from numpy import cos, sin, exp, arctan2, radians, sign, sqrt
 # const
 from numpy import pi
 
-from typing import List, Tuple
-from .common_Mathfunc import gaussianFunc, DRAGFunc
+from typing import Iterator, List, Tuple
+from functools import lru_cache
+from inspect import signature
 from .waveform import Waveform
-from .digital_mixer import upConversion_IQ, upConversion_RF
-import common_Mathfunc as cpf
+from .digital_mixer import upConversion_IQ, upConversion_RF, upConversion_IQ_channels
+from .assembly import EnvelopeAssembler, SequencePlanner, last_nonzero
+from .segment import EnvelopeSegments, DenseEnvelopeList
+from .envelope_cache import give_envelopeCache, give_envelopeKey
+from .nco import give_cos
+from .instrument import instrumented
+from .shapes import give_shape
+from .dedup import WaveformTable, give_segmentTable, give_blockTable
+
+@lru_cache(maxsize=256)
+def _takes_gateTime( envelopeFunc )->bool:
+    """ The envelope function has keyword tg for the gate time."""
+    try:
+        return "tg" in signature(envelopeFunc).parameters
+    except (TypeError, ValueError):
+        return False
+
+def give_envelopeValues( envelopeFunc, time:ndarray, parameters:tuple, gateTime:float )->ndarray:
+    """
+    envelopeFunc( time, *parameters ) on a part of the envelope,\n
+    gateTime (last time minus first time of the whole envelope) is given to the functions with keyword tg.
+    """
+    if _takes_gateTime( envelopeFunc ):
+        return envelopeFunc( time, *parameters, tg=gateTime )
+    return envelopeFunc( time, *parameters )
 
-# 0106 added : full time with envelope signal and other append zero
-def pulse_extend(envelope,startPoint,totalPoints)->ndarray:
-    beforePulse = zeros(startPoint)
-    if envelope.shape[0]+startPoint <= totalPoints:
-        afterPulse = zeros(totalPoints-envelope.shape[0]-startPoint)
-    else:
+def pulse_extend( envelope:ndarray, startPoint:int, totalPoints:int )->ndarray:
+    """
+    Full time sequence of totalPoints with the envelope at startPoint and zero elsewhere.\n
+    Not used by the assembly of QAM (see EnvelopeAssembler), kept for the callers of the old API.
+    """
+    if envelope.shape[0]+startPoint > totalPoints:
         raise IndexError("Pulse is out of given total time !")
-    fullSequence = hstack([beforePulse,envelope,afterPulse])
-
-    # check length
-    if fullSequence.shape[0] == totalPoints:
-        return fullSequence
-    else:
-        raise IndexError("Pulse extend length error")
+    return hstack([ zeros(startPoint), envelope, zeros(totalPoints-envelope.shape[0]-startPoint) ])
 
 # generate IF Frequency array with specified time 
 def give_ifFrequencyArray(ifFrequency,pulseWidth,startPoint,totalPoints,dt)->ndarray:
@@ -115,14 +133,81 @@ class Pulse():
     def adjFrequency ( self, value ):
         self._adjFrequency = value
 
+    @instrumented("envelope")
     def generate_envelope( self, t0:float, dt:float )->Waveform:
-        """ For a given dt and t0, calculate the envelop waveform"""
+        """
+        For a given dt and t0, calculate the envelop waveform.\n
+        If the envelope cache is enabled, the same envelope is shared (read only) by pulses with the same setting.
+        """
+        cache = give_envelopeCache()
+        if cache != None:
+            key = give_envelopeKey( self.envelopeFunc, self.parameters, self.duration, dt, t0, self.carrierPhase )
+            if key != None:
+                cached = cache.get(key)
+                if cached is not None:
+                    return Waveform(t0, dt, cached)
+
         points = int( -(self.duration //-dt) )
         envelope = Waveform(t0, dt, empty(points))
 
         time = envelope.get_xAxis()
         envelope.Y = self.envelopeFunc( time, *self.parameters )
         envelope.Y = exp(1j*self.carrierPhase) *envelope.Y
+        if cache != None and key != None:
+            envelope.Y = cache.put( key, envelope.Y )
+        return envelope
+
+    @instrumented("envelope")
+    def generate_envelope_range( self, t0:float, dt:float, startPoint:int, endPoint:int )->Waveform:
+        """
+        Calculate only the points [startPoint, endPoint) of the envelope given by generate_envelope,\n
+        the gate time of the whole envelope is given to the functions with keyword tg (e.g. Hermite).
+        """
+        points = int( -(self.duration //-dt) )
+        startPoint = max( startPoint, 0 )
+        endPoint = max( min(endPoint, points), startPoint )
+        # same time axis as Waveform.get_xAxis of the whole envelope
+        step = ( (t0+dt*points) -t0 ) /points if points > 0 else dt
+        time = arange(startPoint, endPoint) *step +t0
+
+        envelope = Waveform(t0 +startPoint*step, dt, empty(endPoint-startPoint))
+        envelope.Y = give_envelopeValues( self.envelopeFunc, time, self.parameters, ( (points-1) *step +t0 ) -t0 )
+        envelope.Y = exp(1j*self.carrierPhase) *envelope.Y
+        return envelope
+
+    def iter_envelope( self, t0:float, dt:float, chunkPoints:int )->Iterator[Waveform]:
+        """ Yield the envelope waveform in chunks of chunkPoints."""
+        points = int( -(self.duration //-dt) )
+        for startPoint in range(0, points, chunkPoints):
+            yield self.generate_envelope_range( t0, dt, startPoint, startPoint+chunkPoints )
+
+    @instrumented("envelope")
+    def generate_envelope_sweep( self, t0:float, dt:float )->Waveform:
+        """
+        For a given dt and t0, calculate the envelop waveforms of a parameter sweep at once.\n
+        Any of parameters and carrierPhase can be a 1D array of sweep values,
+        the arrays should have the same length.\n
+        The Y of returned waveform is in shape (sweep, points).
+        """
+        sweepPoints = None
+        for value in (*self.parameters, self.carrierPhase):
+            if ndim(value) == 0: continue
+            if ndim(value) != 1 or (sweepPoints != None and len(value) != sweepPoints):
+                raise ValueError("Sweep values should be 1D arrays with the same length")
+            sweepPoints = len(value)
+        if sweepPoints == None: sweepPoints = 1
+        # sweep along the first axis, time along the last axis
+        parameters = [ p if ndim(p) == 0 else asarray(p)[:,newaxis] for p in self.parameters ]
+        carrierPhase = self.carrierPhase if ndim(self.carrierPhase) == 0 else asarray(self.carrierPhase)[:,newaxis]
+
+        points = int( -(self.duration //-dt) )
+        envelope = Waveform(t0, dt, empty(points))
+
+        time = envelope.get_xAxis()
+        envelopeY = exp(1j*carrierPhase) *self.envelopeFunc( time, *parameters )
+        if envelopeY.shape != (sweepPoints, points):
+            envelopeY = broadcast_to(envelopeY, (sweepPoints, points)).copy()
+        envelope.Y = envelopeY
         return envelope
 
     def generate_signal( self, t0:float, dt:float )->Waveform:
@@ -130,14 +215,29 @@ class Pulse():
 
         envelope = self.generate_envelope( t0, dt )
         signal = Waveform(envelope.x0, envelope.dx, empty(envelope.Y.shape[-1]))
-        time = envelope.get_xAxis()
         if issubdtype(envelope.Y.dtype,complex):
             signal.Y = upConversion_RF( envelope.Y.real, envelope.Y.imag, self.carrierFrequency*dt )
         else:
-            signal.Y = envelope.Y*cos( 2.*pi*self.carrierFrequency*time +self.carrierPhase)
+            carrierPhase = 2.*pi*self.carrierFrequency*t0 +self.carrierPhase
+            signal.Y = envelope.Y*give_cos( self.carrierFrequency*dt, envelope.points, carrierPhase )
 
         return signal
 
+    def iter_signal( self, t0:float, dt:float, chunkPoints:int )->Iterator[Waveform]:
+        """
+        Yield the signal waveform of generate_signal in chunks of chunkPoints,
+        the carrier phase is continuous between chunks.
+        """
+        for envelope in self.iter_envelope( t0, dt, chunkPoints ):
+            offset = int(round( (envelope.x0 -t0) /dt ))
+            signal = Waveform(envelope.x0, envelope.dx, empty(envelope.Y.shape[-1]))
+            if issubdtype(envelope.Y.dtype,complex):
+                signal.Y = upConversion_RF( envelope.Y.real, envelope.Y.imag, self.carrierFrequency*dt, offset=offset )
+            else:
+                carrierPhase = 2.*pi*self.carrierFrequency*t0 +self.carrierPhase
+                signal.Y = envelope.Y*give_cos( self.carrierFrequency*dt, envelope.points, carrierPhase, offset )
+            yield signal
+
     def generate_IQSignal( self, t0:float, dt:float, IFFreq:float, IQMixer:tuple=(1,90,0,0) )->Tuple[Waveform,Waveform,float]:
         """
         For the pulse is generate by IQMixer
@@ -158,6 +258,39 @@ class Pulse():
         freq_LO = self.carrierFrequency - IFFreq
         return signal_I, signal_Q, freq_LO
 
+    def generate_IQSignal_sweep( self, t0:float, dt:float, IFFreq:float, IQMixer:tuple=(1,90,0,0) )->Tuple[Waveform,Waveform,float]:
+        """
+        Same as generate_IQSignal for the envelopes from generate_envelope_sweep,
+        the Y of I/Q waveforms are in shape (sweep, points).
+        """
+        envelope = self.generate_envelope_sweep( t0, dt )
+        data_I, data_Q = upConversion_IQ( envelope.Y, IFFreq*dt, IQMixer)
+        signal_I = Waveform(t0, dt, data_I)
+        signal_Q = Waveform(t0, dt, data_Q)
+        freq_LO = self.carrierFrequency - IFFreq
+        return signal_I, signal_Q, freq_LO
+
+    def iter_IQSignal( self, t0:float, dt:float, chunkPoints:int, IFFreq:float, IQMixer:tuple=(1,90,0,0) )->Iterator[Tuple[Waveform,Waveform]]:
+        """
+        Yield the I/Q waveforms of generate_IQSignal in chunks of chunkPoints,
+        the IF phase is continuous between chunks.
+        """
+        for envelope in self.iter_envelope( t0, dt, chunkPoints ):
+            offset = int(round( (envelope.x0 -t0) /dt ))
+            data_I, data_Q = upConversion_IQ( envelope.Y, IFFreq*dt, IQMixer, offset=offset )
+            yield Waveform(envelope.x0, dt, data_I), Waveform(envelope.x0, dt, data_Q)
+
+def give_lastNonzero( pulse:Pulse, dt:float, chunkPoints:int = 2**16 )->int:
+    """
+    Index of the last nonzero point of the pulse envelope (-1 if all zero),
+    the envelope is calculated in chunks from the end and stops at the first nonzero chunk.
+    """
+    points = int( -(pulse.duration //-dt) )
+    for startPoint in range( (points-1) //chunkPoints *chunkPoints, -1, -chunkPoints ):
+        chunkLast = last_nonzero( pulse.generate_envelope_range( 0, dt, startPoint, startPoint+chunkPoints ).Y )
+        if chunkLast >= 0: return startPoint +chunkLast
+    return -1
+
 class QAM():
     """
     Quadrature amplitude modulation (QAM)
@@ -178,75 +311,136 @@ class QAM():
 
     # 0106 eddition
     # no adjust IF frequency, return whole RF envelope ONLY
+    @instrumented("assembly")
     def give_RFenvelope_IFfrequency( self, pulses:List[Pulse], dt:float = None, totalPoints:int = None ):
         if totalPoints == None: totalPoints = self.totalPoints
         if dt == None: dt = self.dt
-        envelope_RF = zeros(totalPoints, dtype=complex128)
+        assembler = EnvelopeAssembler(totalPoints)
 
         for pulse in pulses:
             self.carrierFrequency = pulse.carrierFrequency
             new_envelope = pulse.generate_envelope( 0, dt ).Y
+            # concat in the last nonzero + 1 point if start point is not given
+            assembler.add( new_envelope, pulse.startPoint )
 
-            startPoint = pulse.startPoint
-
-            if startPoint != "":
-                extended_envelope = pulse_extend(new_envelope,int(startPoint),totalPoints)
-                envelope_RF += extended_envelope
-
-            else:  # concat in the last nonzero + 1 point
-                try:
-                    startPoint = max(nonzero(envelope_RF))
-                    if startPoint + 1 + new_envelope.shape[0] > totalPoints:
-                        raise IndexError("Un-specified start makes out of sequence!")
-                    else:  # action: tail to head concat
-                        extended_envelope = pulse_extend(new_envelope,startPoint+1,totalPoints)
-                        envelope_RF += extended_envelope
-                        
-                except(ValueError):  # envelope_RF is all zero, start from the first point 
-                    startPoint = 1
-                    extended_envelope = pulse_extend(new_envelope,startPoint,totalPoints)
-                    envelope_RF += extended_envelope
-                    
-        return array([]), envelope_RF  # whole connected envelope sequence
+        return array([]), assembler.buffer  # whole connected envelope sequence
 
-    def give_RFIFDict( self, pulses:List[Pulse], dt:float = None, totalPoints:int = None ):
+    @instrumented("assembly")
+    def give_RFenvelope_gates( self, library, names:List[str], startPoint:int = 0, totalPoints:int = None ):
+        """
+        Return the whole envelope sequence of gate names from a GateLibrary,
+        the gates are placed back to back from startPoint.\n
+        The dt of library should be the dt of QAM.
+        """
+        if totalPoints == None: totalPoints = self.totalPoints
+        if library.dt != self.dt:
+            raise ValueError("dt of gate library is different")
+        if len(names) > 0:
+            self.carrierFrequency = library.give_carrierFrequency( names[-1] )
+        return array([]), library.compile( names, startPoint, totalPoints )
+
+    @instrumented("assembly")
+    def give_RFSegments( self, pulses:List[Pulse], dt:float = None, totalPoints:int = None )->Tuple[EnvelopeSegments,ndarray]:
+        """
+        Return the envelope of each pulse only on its own support, and the whole connected sequence.
+        """
         if totalPoints == None: totalPoints = self.totalPoints
         if dt == None: dt = self.dt
-        RFenvelopeList = []
-        RFsequence = zeros(totalPoints, dtype=complex128)  # -> show the whole envelope sequence
+        segments = EnvelopeSegments(totalPoints, dt)
+        assembler = EnvelopeAssembler(totalPoints)  # -> show the whole envelope sequence
         for pulse in pulses:
-            thisEnvelope = zeros(totalPoints, dtype=complex128)  # -> record this envelope with start time and IFadjFreq
             self.carrierFrequency = pulse.carrierFrequency
             new_envelope = pulse.generate_envelope( 0, dt ).Y
+            startPoint = assembler.add( new_envelope, pulse.startPoint )
+            segments.append( startPoint, new_envelope )  # -> record this envelope with start time
+
+        return segments, assembler.buffer
 
-            startPoint = pulse.startPoint
-
-            if startPoint != "":
-                extended_envelope = pulse_extend(new_envelope,int(startPoint),totalPoints)
-                thisEnvelope += extended_envelope
-                RFsequence += extended_envelope
-                
-            else:  # concat in the last nonzero + 1 point
-                try:
-                    startPoint = max(nonzero(RFsequence))
-                    if startPoint + 1 + new_envelope.shape[0] > totalPoints:
-                        raise IndexError("Un-specified start makes out of sequence!")
-                    else:  # action: tail to head concat
-                        extended_envelope = pulse_extend(new_envelope,startPoint+1,totalPoints)
-                        thisEnvelope += extended_envelope
-                        RFsequence += extended_envelope
-                        
-                except(ValueError):  # envelope_RF is all zero, start from the first point 
-                    startPoint = 1
-                    extended_envelope = pulse_extend(new_envelope,startPoint,totalPoints)
-                    thisEnvelope += extended_envelope
-                    RFsequence += extended_envelope
-
-            RFenvelopeList.append([thisEnvelope]) 
+    def give_RFIFDict( self, pulses:List[Pulse], dt:float = None, totalPoints:int = None ):
+        segments, RFsequence = self.give_RFSegments( pulses, dt, totalPoints )
+        RFenvelopeList = DenseEnvelopeList(segments)  # -> full length envelope is formed when it is accessed
         
         return RFenvelopeList, RFsequence # seperated pulse envelope with its IFadjFreq as key, whole connected sequence
+
+    def give_RFTable( self, pulses:List[Pulse], dt:float = None, totalPoints:int = None, blockPoints:int = None )->WaveformTable:
+        """
+        Return the envelope sequence as unique waveforms and a sequence table (see dedup.WaveformTable).\n
+        blockPoints: deduplicate blocks of the whole sequence in this size,
+        otherwise the envelope of each pulse is a waveform.
+        """
+        segments, RFsequence = self.give_RFSegments( pulses, dt, totalPoints )
+        if blockPoints == None:
+            return give_segmentTable( segments )
+        return give_blockTable( RFsequence, blockPoints )
         
         
+    def give_startPoints( self, pulses:List[Pulse], dt:float = None, totalPoints:int = None, chunkPoints:int = 2**16 )->List[int]:
+        """
+        Start point of each pulse in the sequence of give_RFenvelope_IFfrequency.\n
+        Only the pulses followed by a concatenated pulse (empty startPoint) are calculated,
+        in chunks from the end until their last nonzero point is found.\n
+        Overlapped pulses are assumed not to cancel each other exactly at the tail of sequence.
+        """
+        if totalPoints == None: totalPoints = self.totalPoints
+        if dt == None: dt = self.dt
+        # the tails after the last concatenated pulse are never used
+        tailPulses = 0
+        for index, pulse in enumerate(pulses):
+            if pulse.startPoint == "": tailPulses = index
+        planner = SequencePlanner(totalPoints)
+        startPoints = []
+        for index, pulse in enumerate(pulses):
+            points = int( -(pulse.duration //-dt) )
+            lastNonzero = -1
+            if index < tailPulses:
+                lastNonzero = give_lastNonzero( pulse, dt, chunkPoints )
+            startPoints.append( planner.add( points, lastNonzero, pulse.startPoint ) )
+        return startPoints
+
+    def iter_RFenvelope( self, pulses:List[Pulse], chunkPoints:int, dt:float = None, totalPoints:int = None )->Iterator[Waveform]:
+        """
+        Yield the envelope sequence of give_RFenvelope_IFfrequency in chunks of chunkPoints,
+        only the pulses overlapped with a chunk are calculated on its points.
+        """
+        if totalPoints == None: totalPoints = self.totalPoints
+        if dt == None: dt = self.dt
+        startPoints = self.give_startPoints( pulses, dt, totalPoints, chunkPoints )
+        spans = []  # (start, end, order)
+        for order, (pulse, startPoint) in enumerate(zip(pulses, startPoints)):
+            self.carrierFrequency = pulse.carrierFrequency
+            spans.append( (startPoint, startPoint +int( -(pulse.duration //-dt) ), order) )
+        spans.sort()
+
+        nextSpan = 0
+        activeSpans = []
+        for chunkStart in range(0, totalPoints, chunkPoints):
+            chunkEnd = chunkStart +chunkPoints if chunkStart +chunkPoints < totalPoints else totalPoints
+            while nextSpan < len(spans) and spans[nextSpan][0] < chunkEnd:
+                activeSpans.append( spans[nextSpan] )
+                nextSpan += 1
+            activeSpans = [ span for span in activeSpans if span[1] > chunkStart ]
+            # add in the pulse order, same as the whole sequence
+            activeSpans.sort( key=lambda span: span[2] )
+
+            chunk = zeros(chunkEnd-chunkStart, dtype=complex128)
+            for startPoint, endPoint, order in activeSpans:
+                cutStart = startPoint if startPoint > chunkStart else chunkStart
+                cutEnd = endPoint if endPoint < chunkEnd else chunkEnd
+                window = chunk[cutStart-chunkStart:cutEnd-chunkStart]
+                window += pulses[order].generate_envelope_range( 0, dt, cutStart-startPoint, cutEnd-startPoint ).Y
+            yield Waveform(chunkStart*dt, dt, chunk)
+
+    def iter_SSB( self, freqIF:float, pulses:List[Pulse], chunkPoints:int, dt:float = None, totalPoints:int = None, IQMixer:tuple=(1,90,0,0) )->Iterator[Tuple[Waveform,Waveform]]:
+        """
+        Yield the I/Q of SSB for the envelope sequence of given pulses in chunks of chunkPoints,
+        the IF phase is continuous between chunks.
+        """
+        if dt == None: dt = self.dt
+        for envelope in self.iter_RFenvelope( pulses, chunkPoints, dt, totalPoints ):
+            offset = int(round( envelope.x0 /dt ))
+            signal_I, signal_Q = upConversion_IQ( envelope.Y, freqIF*dt, IQMixer=IQMixer, offset=offset )
+            yield Waveform(envelope.x0, dt, signal_I), Waveform(envelope.x0, dt, signal_Q)
+
     def SSB( self, freqIF:float, envelope_RF:ndarray = None, dt:float = None, IQMixer:tuple=(1,90,0,0) )->Tuple[ndarray,ndarray,float]:
         """
         For the pulse is generate by IQMixer
@@ -261,7 +455,7 @@ class QAM():
         The LO frequency should be RF-IF (RF is carrier frequency)
         """
         if dt == None: dt = self.dt
-        if envelope_RF == None: envelope_RF = self.envelope
+        if envelope_RF is None: envelope_RF = self.envelope
         signal_I, signal_Q = upConversion_IQ( envelope_RF, freqIF*dt, IQMixer=IQMixer )
         if self.carrierFrequency != None:
             freq_LO = self.carrierFrequency - freqIF
@@ -269,6 +463,24 @@ class QAM():
         else: # Do not care carrier frequency
             return signal_I, signal_Q
 
+    def SSB_channels( self, freqsIF:ndarray, envelopes_RF:ndarray, IQMixers:ndarray, carrierFrequencies:ndarray = None, dt:float = None )->Tuple[ndarray,ndarray,ndarray]:
+        """
+        SSB for multiple channels in one vectorized pass. \n
+        freqsIF: The Intermediate frequency of each channel ( Unit in dt ), shape (channels,) \n
+        envelopes_RF: shape (channels, points) \n
+        IQMixers: The IQMixer calibration of each channel, shape (channels, 4) \n
+        carrierFrequencies: The carrier frequency of each channel, shape (channels,) \n
+        Return I, Q in shape (channels, points) and LO frequencies (RF-IF) if carrierFrequencies is given.
+        """
+        if dt == None: dt = self.dt
+        freqsIF = asarray(freqsIF, dtype=float)
+        signal_I, signal_Q = upConversion_IQ_channels( envelopes_RF, freqsIF*dt, IQMixers )
+        if carrierFrequencies is not None:
+            freqs_LO = asarray(carrierFrequencies, dtype=float) - freqsIF
+            return signal_I, signal_Q, freqs_LO
+        else: # Do not care carrier frequency
+            return signal_I, signal_Q
+
 
 
 # API
@@ -283,7 +495,7 @@ def get_Pulse_gauss ( duration:float, parameters:tuple, carrierFrequency:float=0
     newPulse.carrierFrequency = carrierFrequency
     newPulse.carrierPhase = carrierPhase
     newPulse.duration = duration
-    newPulse.envelopeFunc = gaussianFunc
+    newPulse.envelopeFunc = give_shape("gaussian").envelopeFunc
     newPulse.parameters = parameters
 
     return newPulse
@@ -301,7 +513,7 @@ def get_Pulse_DRAG ( duration:float, parameters:tuple, carrierFrequency:float=0,
     newPulse.carrierFrequency = carrierFrequency
     newPulse.carrierPhase = carrierPhase
     newPulse.duration = duration
-    newPulse.envelopeFunc = DRAGFunc
+    newPulse.envelopeFunc = give_shape("drag").envelopeFunc
     newPulse.parameters = parameters
 
     return newPulse
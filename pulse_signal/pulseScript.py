@@ -1,145 +1,158 @@
 # Type
-from numpy import nan, isnan 
-# Math
-from numpy import pi, radians
+from numpy import nan
+# Array
+from numpy import array
 
-import common_Mathfunc as cpf
+from typing import Callable, Iterable, List, Tuple
+from functools import lru_cache
 from .pulse import Pulse
+from .shapes import give_scriptShape, add_registerHook
+from .instrument import instrumented
+
+
+class CompiledBeat():
+    """
+    The parsed beat "function/p1/p2..." with resolved envelope function and default parameters.\n
+    The envelope parameters only depend on the duration (width) and amplitude (height).
+    """
+    __slots__ = ("_waveform", "_envelopeFunc", "_carrierPhase", "_give_funcParas")
+
+    def __init__ ( self, waveform:str, envelopeFunc:Callable, carrierPhase:float, give_funcParas:Callable ):
+        self._waveform = waveform
+        self._envelopeFunc = envelopeFunc
+        self._carrierPhase = carrierPhase
+        self._give_funcParas = give_funcParas
+
+    @property
+    def waveform ( self )->str:
+        """ The name of waveform."""
+        return self._waveform
+
+    @property
+    def envelopeFunc ( self )->Callable:
+        """ The function to form the envelope."""
+        return self._envelopeFunc
+
+    @property
+    def carrierPhase ( self )->float:
+        """ The carrier phase given by rotation axis."""
+        return self._carrierPhase
+
+    def give_parameters( self, width:float, height:float )->list:
+        """ The parameters for the envelope function."""
+        return self._give_funcParas(width, height)
+
+    def give_pulse( self, width:float, height:float )->Pulse:
+        new_pulse = Pulse()
+        new_pulse.duration = width
+        new_pulse.envelopeFunc = self._envelopeFunc
+        new_pulse.carrierPhase = self._carrierPhase
+        new_pulse.parameters = self._give_funcParas(width, height)
+        return new_pulse
 
 
 # try to put this function into waveform.py but with circular import error
 # give waveform parametars like sigma, amplitude,...
-def give_waveformInfo(beat,width,height)->dict:
+@lru_cache(maxsize=1024)
+def compile_beat(beat)->CompiledBeat:
     paraList = []
     for p in beat.split(',')[0].split('/')[1:]:
         if p == '':
             paraList.append( nan )
         else:
-            paraList.append( float(p) )     
+            paraList.append( float(p) )
     # waveformParas -> flat : nan , drag : 4,-0.8,0
 
     waveform = beat.split('/')[0]
-    print(waveform)
-    match waveform:
-        case "flat":
-            pulse_func = cpf.constFunc
-            func_paras = [height]
-            carrierPhase = 0
-        case "gauss":
-            pulse_func = cpf.GaussianFamily
-            if isnan(paraList[0]): sfactor = 4
-            else: sfactor = paraList[0]
-            carrierPhase = 0
-            func_paras = [height, width/sfactor, width/2, 0]
-
-        case "gaussup":
-            pulse_func = cpf.GaussianFamily
-            if isnan(paraList[0]): sfactor = 4
-            else: sfactor = paraList[0]
-            carrierPhase = 0
-            func_paras = [height, width*2/sfactor, width,0]
-
-        case "gaussdn":
-            pulse_func = cpf.GaussianFamily
-            if isnan(paraList[0]): sfactor = 4
-            else: sfactor = paraList[0]
-            carrierPhase = 0
-            func_paras = [height, width*2/sfactor, 0, 0]
-
-
-        case "drage":   # waveform with ErfGaussian
-            pulse_func = cpf.DRAGFunc
-            if len(paraList)==1:
-                sfactor = 6
-                dRatio = 0.5
-                rotAxis = 0
-
-            else:
-                if isnan(paraList[0]): sfactor = 6
-                else: sfactor = paraList[0]
-                if isnan(paraList[1]): dRatio = 0.5
-                else: dRatio = paraList[1]
-                if isnan(paraList[2]): rotAxis = 0
-                else: rotAxis = radians(paraList[2])
-            carrierPhase = pi *(rotAxis/180.)
-            shift = cpf.ErfShifter(width,width/sfactor)
-            
-            func_paras = [height, width/sfactor, width/2, shift*height, dRatio ]
-        
-        case "dragh":   # waveform with hermite
-            pulse_func = cpf.DRAGFunc_Hermite
-            if len(paraList)==1:
-                A = 1.67
-                alpha = 4
-                beta = 4
-                dRatio = 0.5
-
-                rotAxis = 0
-            else:
-                if isnan(paraList[0]): A = 1.67
-                else: A = paraList[0]
-                if isnan(paraList[1]): alpha = 4
-                else: alpha = paraList[1]
-                if isnan(paraList[2]): beta = 4
-                else: beta = paraList[2]
-                if isnan(paraList[3]): dRatio = 0.5
-                else: dRatio = paraList[3]
-                if isnan(paraList[4]): rotAxis = 0
-                else: rotAxis = radians(paraList[4])
-
-            carrierPhase = pi *(rotAxis/180.)
-            func_paras = [height, alpha, beta, width/2, dRatio ]
-
-        case "drag":
-            pulse_func = cpf.DRAGFunc
-            if len(paraList)==1:
-                sfactor = 4
-                dRatio = 1
-                rotAxis = 0
-            else:
-                if isnan(paraList[0]): sfactor = 4
-                else: sfactor = paraList[0]
-                if isnan(paraList[1]): dRatio = 1
-                else: dRatio = paraList[1]
-                if isnan(paraList[2]): rotAxis = 0
-                else: rotAxis = radians(paraList[2])
-            carrierPhase = pi *(rotAxis/180.)
-            func_paras = [height, width/sfactor, width/2, 0, dRatio ]
-
-        case "lin":
-            pulse_func = cpf.linearFunc
-            if isnan(paraList[0]): start = 0
-            else: start = paraList[0]
-            if isnan(paraList[1]): end = 0
-            else: end = paraList[1]
-            carrierPhase = 0
-            slope = (start-end)/width
-            func_paras = [slope, start]
-
-        case "gerp":
-            pulse_func = cpf.GERPFunc
-            if len(paraList)==1:
-                sfactor = 4
-                edgeWidth = 30
-                peakMultiplier = 0
-            else:
-                if isnan(paraList[0]): sfactor = 4
-                else: sfactor = paraList[0]
-                if isnan(paraList[1]): edgeWidth = 30
-                else: edgeWidth = paraList[1]
-                if isnan(paraList[2]): peakMultiplier = 0
-                else: peakMultiplier = paraList[2]
-            carrierPhase = 0
-            func_paras = [height, width, 0, edgeWidth, edgeWidth*2/sfactor]
-        case _:
-            pulse_func = cpf.constFunc
-            func_paras = [height]
-            carrierPhase = 0
-
-    new_pulse = Pulse()
-    new_pulse.duration = width
-    new_pulse.envelopeFunc = pulse_func
-    new_pulse.carrierPhase = carrierPhase
-    new_pulse.parameters = func_paras
-    
-    return new_pulse
\ No newline at end of file
+    shape = give_scriptShape( waveform )  # unknown waveform is flat
+    values = shape.give_scriptValues( paraList )
+    func_paras = lambda width, height: shape.give_parameters( width, height, values )
+
+    return CompiledBeat( waveform, shape.envelopeFunc, shape.give_carrierPhase( values ), func_paras )
+
+
+@instrumented("parse")
+def give_waveformInfo(beat,width,height)->Pulse:
+    return compile_beat(beat).give_pulse(width, height)
+
+
+class PulseProgram():
+    """
+    Immutable compiled script, each line is "function/p1/p2...,duration,amplitude".\n
+    Identical beats share one CompiledBeat, so the script is parsed only once.
+    """
+    __slots__ = ("_beats", "_durations", "_amplitudes")
+
+    def __init__ ( self, beats:Tuple[CompiledBeat], durations:Tuple[float], amplitudes:Tuple[float] ):
+        self._beats = tuple(beats)
+        self._durations = tuple(durations)
+        self._amplitudes = tuple(amplitudes)
+
+    def __len__ ( self )->int:
+        return len(self._beats)
+
+    @property
+    def beats ( self )->Tuple[CompiledBeat]:
+        """ The compiled beat of each line."""
+        return self._beats
+
+    @property
+    def durations ( self )->Tuple[float]:
+        """ The duration of each line given in script."""
+        return self._durations
+
+    @property
+    def amplitudes ( self )->Tuple[float]:
+        """ The amplitude of each line given in script."""
+        return self._amplitudes
+
+    def give_pulses( self, durations:Iterable[float]=None, amplitudes:Iterable[float]=None )->List[Pulse]:
+        """
+        Return the pulse of each line.\n
+        durations, amplitudes: replace the values given in script, without parsing the script again.
+        """
+        if durations is None: durations = self._durations
+        if amplitudes is None: amplitudes = self._amplitudes
+        if len(durations) != len(self._beats) or len(amplitudes) != len(self._beats):
+            raise ValueError("Number of durations or amplitudes is different from beats")
+        return [ beat.give_pulse(width, height) for beat, width, height in zip(self._beats, durations, amplitudes) ]
+
+
+@instrumented("parse")
+def compile_lines( lines:Iterable[str] )->PulseProgram:
+    """
+    Compile script lines "function/p1/p2...,duration,amplitude".\n
+    Each line is split in Python, the beats are parsed once for each distinct head (compile_beat cache)
+    and the durations and amplitudes of all lines are converted to numbers at once.\n
+    Empty lines are ignored.
+    """
+    heads = []
+    durations = []
+    amplitudes = []
+    for line in lines:
+        line = line.strip()
+        if line == "": continue
+        head, duration, amplitude = line.split(',')
+        heads.append(head)
+        durations.append(duration)
+        amplitudes.append(amplitude)
+    beats = [ compile_beat(head) for head in heads ]
+    # numeric fields are converted together
+    durations = array(durations, dtype=float).tolist()
+    amplitudes = array(amplitudes, dtype=float).tolist()
+    return PulseProgram( beats, durations, amplitudes )
+
+@lru_cache(maxsize=64)
+def compile_script( script:str )->PulseProgram:
+    """
+    Compile a multi-line script, the program is cached by script text.
+    """
+    return compile_lines( script.splitlines() )
+
+
+def clear_compiledCache():
+    """ Clear the compiled beats and scripts, called when a shape is registered."""
+    compile_beat.cache_clear()
+    compile_script.cache_clear()
+
+add_registerHook( clear_compiledCache )
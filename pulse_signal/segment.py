@@ -0,0 +1,102 @@
+# Numpy
+# Typing
+from numpy import ndarray, complex128
+# Array
+from numpy import zeros
+
+from typing import Iterator, Tuple
+from collections.abc import Sequence
+
+
+class EnvelopeSegments():
+    """
+    Sparse form of the pulse envelopes in a sequence.\n
+    Each pulse is stored as (startPoint, envelope) with the envelope only on its own support.
+    """
+    def __init__ ( self, totalPoints:int, dt:float=1, dtype=complex128 ):
+        self.totalPoints = totalPoints
+        self.dt = dt
+        self.dtype = dtype
+        self._segments = []
+
+    def append( self, startPoint:int, envelope:ndarray ):
+        """ Add the envelope of the next pulse."""
+        if startPoint < 0 or startPoint +envelope.shape[-1] > self.totalPoints:
+            raise IndexError("Pulse is out of given total time !")
+        self._segments.append( (int(startPoint), envelope) )
+
+    def __len__ ( self )->int:
+        return len(self._segments)
+
+    def __getitem__ ( self, index:int )->Tuple[int,ndarray]:
+        return self._segments[index]
+
+    def __iter__ ( self )->Iterator[Tuple[int,ndarray]]:
+        return iter(self._segments)
+
+    @property
+    def nbytes ( self )->int:
+        """ Memory used by the stored envelopes."""
+        return sum( envelope.nbytes for _, envelope in self._segments )
+
+    def give_dense( self, index:int=None )->ndarray:
+        """
+        Return the full length envelope of the pulse with given index,
+        the whole sequence if index is None.
+        """
+        dense = zeros(self.totalPoints, dtype=self.dtype)
+        if index == None:
+            segments = self._segments
+        else:
+            segments = [self._segments[index]]
+        for startPoint, envelope in segments:
+            window = dense[startPoint:startPoint+envelope.shape[-1]]
+            window += envelope
+        return dense
+
+    def give_window( self, startPoint:int, endPoint:int ):
+        """
+        Return the segments overlapped with points [startPoint, endPoint).\n
+        The start points in returned segments are relative to startPoint,
+        the envelopes are views of the stored ones.
+        """
+        startPoint = max(startPoint, 0)
+        endPoint = min(endPoint, self.totalPoints)
+        window = EnvelopeSegments(max(endPoint-startPoint, 0), self.dt, self.dtype)
+        for segmentStart, envelope in self._segments:
+            segmentEnd = segmentStart +envelope.shape[-1]
+            if segmentEnd <= startPoint or segmentStart >= endPoint:
+                continue
+            cutStart = max(segmentStart, startPoint)
+            cutEnd = min(segmentEnd, endPoint)
+            window._segments.append( (cutStart-startPoint, envelope[cutStart-segmentStart:cutEnd-segmentStart]) )
+        return window
+
+    def give_timeWindow( self, startTime:float, endTime:float ):
+        """
+        Return the segments overlapped with time [startTime, endTime), unit depended on dt.
+        """
+        startPoint = int( -(startTime //-self.dt) )
+        endPoint = int( -(endTime //-self.dt) )
+        return self.give_window( startPoint, endPoint )
+
+
+class DenseEnvelopeList( Sequence ):
+    """
+    Read only list in the format of [ [full length envelope], ... ] for each pulse.\n
+    The full length envelope is formed when it is accessed.
+    """
+    def __init__ ( self, segments:EnvelopeSegments ):
+        self.segments = segments
+
+    def __len__ ( self )->int:
+        return len(self.segments)
+
+    def __getitem__ ( self, index ):
+        if isinstance(index, slice):
+            return [ self[i] for i in range(*index.indices(len(self))) ]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("list index out of range")
+        return [self.segments.give_dense(index)]
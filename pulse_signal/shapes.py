@@ -0,0 +1,144 @@
+# Numpy
+from numpy import isnan, radians
+# const
+from numpy import pi
+
+from typing import Callable, Dict, List, Tuple
+from importlib import import_module
+
+
+def _give_mathFunc( name:str )->Callable:
+    """ The function name of common_Mathfunc, the module is imported on first use."""
+    return getattr( import_module(".common_Mathfunc", __package__), name )
+
+
+class EnvelopeShape():
+    """
+    An envelope shape: the envelope function and how the script parameters form its parameters.\n
+    name: the name used in script "name/p1/p2...,duration,amplitude"\n
+    funcName: name of the envelope function, resolved (and its module imported) on first use\n
+    parameterNames: names of the envelope function parameters\n
+    scriptDefaults: default value of each script parameter, used when it is empty\n
+    give_funcParas: ( width, height, scriptValues ) -> envelope function parameters\n
+    rotationIndex: index of the script parameter for the rotation axis, None if there is no rotation\n
+    allDefaults: one script parameter ( e.g. "drag/" ) gives all defaults\n
+    metadata: other information, e.g. description
+    """
+    def __init__ ( self, name:str, funcName:str, parameterNames:Tuple[str]=(), scriptDefaults:tuple=(), give_funcParas:Callable=None,
+                   rotationIndex:int=None, allDefaults:bool=False, metadata:dict=None ):
+        self.name = name
+        self.funcName = funcName
+        self.parameterNames = tuple(parameterNames)
+        self.scriptDefaults = tuple(scriptDefaults)
+        self.give_funcParas = give_funcParas
+        self.rotationIndex = rotationIndex
+        self.allDefaults = allDefaults
+        self.metadata = {} if metadata == None else dict(metadata)
+        self._envelopeFunc = None
+
+    @property
+    def envelopeFunc ( self )->Callable:
+        """ The function to form the envelope."""
+        if self._envelopeFunc == None:
+            self._envelopeFunc = _give_mathFunc( self.funcName )
+        return self._envelopeFunc
+
+    @property
+    def scriptable ( self )->bool:
+        """ The shape can be used in script."""
+        return self.give_funcParas != None
+
+    def give_scriptValues( self, paraList:List[float] )->tuple:
+        """ Script parameters with empty ones (nan) replaced by defaults."""
+        if self.allDefaults and len(paraList) == 1:
+            return self.scriptDefaults
+        return tuple( default if isnan(paraList[i]) else paraList[i] for i, default in enumerate(self.scriptDefaults) )
+
+    def give_carrierPhase( self, scriptValues:tuple )->float:
+        """ The carrier phase given by rotation axis."""
+        if self.rotationIndex == None: return 0
+        return pi *(radians(scriptValues[self.rotationIndex])/180.)
+
+    def give_parameters( self, width:float, height:float, scriptValues:tuple )->list:
+        """ The parameters of envelope function for duration (width) and amplitude (height)."""
+        return self.give_funcParas( width, height, scriptValues )
+
+    def __repr__ ( self ):
+        return "EnvelopeShape(%r, %r)" %(self.name, self.funcName)
+
+
+# Registered shapes by name
+_shapes = {}
+# Called when a shape is registered, e.g. to clear the compiled script cache
+_registerHooks = []
+
+def register_shape( shape:EnvelopeShape ):
+    """ Add the shape to registry, a shape with the same name is replaced."""
+    _shapes[shape.name] = shape
+    for hook in _registerHooks:
+        hook()
+
+def add_registerHook( callback:Callable ):
+    """ Call callback() after every register_shape, e.g. to clear caches of the compiled shapes."""
+    _registerHooks.append( callback )
+
+def give_shape( name:str )->EnvelopeShape:
+    """ The registered shape of name."""
+    if name not in _shapes:
+        raise KeyError("Envelope shape '%s' is not registered" %name)
+    return _shapes[name]
+
+def give_shapeNames()->List[str]:
+    """ Names of the registered shapes."""
+    return list(_shapes)
+
+def give_scriptShape( name:str )->EnvelopeShape:
+    """ The shape for name in script, unknown names are flat."""
+    shape = _shapes.get(name)
+    if shape == None or not shape.scriptable:
+        return _shapes["flat"]
+    return shape
+
+
+def _give_drageParas( width:float, height:float, values:tuple )->list:
+    sfactor, dRatio = values[0], values[1]
+    shift = _give_mathFunc("ErfShifter")( width, width/sfactor )
+    return [height, width/sfactor, width/2, shift*height, dRatio ]
+
+GAUSSIAN_PARAMETERS = ("amp", "sigma", "peak position", "shift")
+DRAG_PARAMETERS = ("amp", "sigma", "peak position", "shift", "derivative ratio")
+HERMITE_PARAMETERS = ("A", "alpha", "beta", "peak position", "derivative ratio")
+
+for _shape in [
+    EnvelopeShape( "flat", "constFunc", ("value",), (),
+                   lambda width, height, values: [height],
+                   metadata={"description": "constant amplitude", "complex": False} ),
+    EnvelopeShape( "gauss", "GaussianFamily", GAUSSIAN_PARAMETERS, (4,),
+                   lambda width, height, values: [height, width/values[0], width/2, 0],
+                   metadata={"description": "Gaussian peaked at the center, sigma = duration/sfactor", "complex": False} ),
+    EnvelopeShape( "gaussup", "GaussianFamily", GAUSSIAN_PARAMETERS, (4,),
+                   lambda width, height, values: [height, width*2/values[0], width, 0],
+                   metadata={"description": "rising half Gaussian, sigma = 2 duration/sfactor", "complex": False} ),
+    EnvelopeShape( "gaussdn", "GaussianFamily", GAUSSIAN_PARAMETERS, (4,),
+                   lambda width, height, values: [height, width*2/values[0], 0, 0],
+                   metadata={"description": "falling half Gaussian, sigma = 2 duration/sfactor", "complex": False} ),
+    EnvelopeShape( "drage", "DRAGFunc_fused", DRAG_PARAMETERS, (6, 0.5, 0), _give_drageParas, rotationIndex=2, allDefaults=True,
+                   metadata={"description": "DRAG with Gaussian shifted to zero at the ends", "complex": True} ),
+    EnvelopeShape( "dragh", "DRAGFunc_Hermite_fused", HERMITE_PARAMETERS, (1.67, 4, 4, 0.5, 0),
+                   lambda width, height, values: [height, values[1], values[2], width/2, values[3] ], rotationIndex=4, allDefaults=True,
+                   metadata={"description": "DRAG with Hermite envelope", "complex": True} ),
+    EnvelopeShape( "drag", "DRAGFunc_fused", DRAG_PARAMETERS, (4, 1, 0),
+                   lambda width, height, values: [height, width/values[0], width/2, 0, values[1] ], rotationIndex=2, allDefaults=True,
+                   metadata={"description": "DRAG with Gaussian, sigma = duration/sfactor", "complex": True} ),
+    EnvelopeShape( "lin", "linearFunc", ("slope", "intercept"), (0, 0),
+                   lambda width, height, values: [(values[0]-values[1])/width, values[0]],
+                   metadata={"description": "linear from start to end", "complex": False} ),
+    EnvelopeShape( "gerp", "GERPFunc_auto", ("amp", "width", "start", "edge width", "edge sigma"), (4, 30, 0),
+                   lambda width, height, values: [height, width, 0, values[1], values[1]*2/values[0]], allDefaults=True,
+                   metadata={"description": "rectangular pulse with Gaussian edges", "complex": False} ),
+    # For Pulse factories only
+    EnvelopeShape( "gaussian", "gaussianFunc", ("amp", "sigma", "peak position"),
+                   metadata={"description": "Gaussian", "complex": False} ),
+    ]:
+    register_shape( _shape )
+del _shape
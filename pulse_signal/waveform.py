@@ -2,7 +2,7 @@
 # Typing
 from numpy import ndarray
 # Array
-from numpy import array, append, linspace
+from numpy import array, append, linspace, empty, result_type
 
 
 
@@ -47,4 +47,94 @@ class Waveform():
             raise ValueError("dx are different")
 
     def get_xAxis ( self ):
-        return linspace(self.x0, self.x0+self.dx*self.points,self.points, endpoint=False)
\ No newline at end of file
+        return linspace(self.x0, self.x0+self.dx*self.points,self.points, endpoint=False)
+
+class WaveformBuilder():
+    """
+    Build a Waveform by appending many waveforms.\n
+    The buffer capacity is doubled when it is full, so appending n waveforms costs O(n) copies.
+    """
+    def __init__( self, x0:float=None, dx:float=None, capacity:int=1024 ):
+        self.x0 = x0
+        self.dx = dx
+        self._axis = (x0, dx)
+        self._capacity = capacity
+        self._buffer = None
+        self._points = 0
+
+    @property
+    def points( self )->int:
+        """ Number of points appended """
+        return self._points
+
+    def append( self, appended:Waveform ):
+        self.extend( [appended] )
+
+    def extend( self, waveforms ):
+        """ Append waveforms in order, the buffer grows at most once """
+        waveforms = list(waveforms)
+        if len(waveforms) == 0: return
+        dx = waveforms[0].dx if self.dx is None else self.dx
+        for waveform in waveforms:
+            if waveform.dx != dx:
+                raise ValueError("dx are different")
+
+        dataType = result_type( *[waveform.Y for waveform in waveforms] )
+        if self._buffer is None:
+            leading = waveforms[0].Y.shape[:-1]
+        else:
+            dataType = result_type( self._buffer, dataType )
+            leading = self._buffer.shape[:-1]
+        for waveform in waveforms:
+            if waveform.Y.shape[:-1] != leading:
+                raise ValueError("Shapes of Y are different")
+
+        if self.dx is None: self.dx = dx
+        if self.x0 is None: self.x0 = waveforms[0].x0
+        required = self._points +sum( waveform.points for waveform in waveforms )
+        self._reserve( required, leading, dataType )
+        for waveform in waveforms:
+            self._buffer[...,self._points:self._points+waveform.points] = waveform.Y
+            self._points += waveform.points
+
+    def _reserve( self, required:int, leading:tuple, dataType ):
+        if self._buffer is not None and required <= self._buffer.shape[-1] and dataType == self._buffer.dtype:
+            return
+        capacity = self._capacity if self._buffer is None else self._buffer.shape[-1]
+        if capacity < 1: capacity = 1
+        while capacity < required:
+            capacity *= 2
+        buffer = empty( leading +(capacity,), dtype=dataType )
+        if self._buffer is not None:
+            buffer[...,:self._points] = self._buffer[...,:self._points]
+        self._buffer = buffer
+
+    def _trim( self ):
+        capacity = self._buffer.shape[-1]
+        if self._points == capacity: return
+        leading = self._buffer.shape[:-1]
+        # pack the rows to the front, then realloc the owned buffer
+        flat = self._buffer.reshape(-1)
+        for row in range( 1, flat.shape[0]//capacity ):
+            flat[row*self._points:(row+1)*self._points] = flat[row*capacity:row*capacity+self._points]
+        del flat
+        self._buffer.resize( leading +(self._points,), refcheck=False )
+
+    def finalize( self, trim:bool=False )->Waveform:
+        """
+        Return the built Waveform, Y is a view of the buffer without copy.\n
+        trim: shrink the buffer to the appended points in place (realloc, usually no copy) to release the unused capacity\n
+        The builder is emptied, later appends start a new buffer with x0 and dx given to the builder.
+        """
+        if self._buffer is None:
+            Y = array([])
+        elif trim:
+            self._trim()
+            Y = self._buffer
+        else:
+            Y = self._buffer[...,:self._points]
+        waveform = Waveform( 0 if self.x0 is None else self.x0, 1 if self.dx is None else self.dx, Y )
+        self._buffer = None
+        self._points = 0
+        self.x0, self.dx = self._axis
+        return waveform
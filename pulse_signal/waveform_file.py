@@ -0,0 +1,134 @@
+# Numpy
+# Typing
+from numpy import ndarray, dtype
+# Array
+from numpy import memmap, empty, asarray, ascontiguousarray
+
+from typing import Iterable
+import struct
+from time import perf_counter
+from .waveform import Waveform
+from .instrument import is_enabled, record
+
+
+# Header: magic, version, dtype, channels, points, x0, dx, padded to HEADER_SIZE bytes
+MAGIC = b"PSWF"
+VERSION = 1
+HEADER_FORMAT = "<4sH8sIQdd"
+HEADER_SIZE = 64
+
+
+def _pack_header( dataType:dtype, channels:int, points:int, x0:float, dx:float )->bytes:
+    header = struct.pack( HEADER_FORMAT, MAGIC, VERSION, dataType.str.encode("ascii"), channels, points, x0, dx )
+    return header.ljust(HEADER_SIZE, b"\0")
+
+def read_header( path:str )->dict:
+    """ Return dtype, channels, points, x0 and dx stored in the file."""
+    with open(path, "rb") as file:
+        raw = file.read(HEADER_SIZE)
+    if len(raw) != HEADER_SIZE or raw[:4] != MAGIC:
+        raise ValueError("Not a waveform file")
+    _, version, dataType, channels, points, x0, dx = struct.unpack( HEADER_FORMAT, raw[:struct.calcsize(HEADER_FORMAT)] )
+    if version != VERSION:
+        raise ValueError("Unsupported waveform file version %d" %version)
+    return {
+        "dtype": dtype(dataType.rstrip(b"\0").decode("ascii")),
+        "channels": channels,
+        "points": points,
+        "x0": x0,
+        "dx": dx,
+    }
+
+
+class WaveformWriter():
+    """
+    Write waveform points to a file incrementally, e.g. chunks from a streaming producer.\n
+    Points of all channels are stored interleaved in time order, so each append is written at the file end.
+    """
+    def __init__ ( self, path:str, channels:int=1, dataType=float, x0:float=0, dx:float=1 ):
+        self.path = path
+        self.channels = channels
+        self.dtype = dtype(dataType)
+        self.x0 = x0
+        self.dx = dx
+        self._points = 0
+        self._file = open(path, "wb")
+        self._file.write( _pack_header( self.dtype, channels, 0, x0, dx ) )
+
+    @property
+    def points ( self )->int:
+        """ Number of points written for each channel."""
+        return self._points
+
+    def append( self, data:ndarray ):
+        """
+        Append points, data is in shape (points,) for one channel or (channels, points).
+        """
+        start = perf_counter() if is_enabled() else None
+        data = asarray(data, dtype=self.dtype)
+        if data.ndim == 1: data = data[None,:]
+        if data.shape[0] != self.channels:
+            raise ValueError("Number of channels is different")
+        self._file.write( ascontiguousarray(data.T).tobytes() )
+        self._points += data.shape[1]
+        self._write_header()
+        if start != None:  # samples and bytes written
+            record( "export", "WaveformWriter.append", perf_counter() -start, data.size, data.nbytes )
+
+    def extend( self, chunks:Iterable[ndarray] ):
+        """ Append every chunk in order."""
+        for chunk in chunks:
+            self.append( chunk )
+
+    def _write_header( self ):
+        position = self._file.tell()
+        self._file.seek(0)
+        self._file.write( _pack_header( self.dtype, self.channels, self._points, self.x0, self.dx ) )
+        self._file.seek(position)
+
+    def close( self ):
+        if not self._file.closed:
+            self._file.flush()
+            self._file.close()
+
+    def __enter__ ( self ):
+        return self
+
+    def __exit__ ( self, *exc ):
+        self.close()
+
+
+def save_waveform( path:str, waveform:Waveform, dataType=None ):
+    """
+    Write the waveform to a file, Y in shape (points,) or (channels, points).
+    """
+    Y = asarray(waveform.Y)
+    channels = 1 if Y.ndim == 1 else Y.shape[0]
+    if dataType is None: dataType = Y.dtype
+    with WaveformWriter( path, channels, dataType, waveform.x0, waveform.dx ) as writer:
+        writer.append( Y )
+
+def save_channels( path:str, channels:Iterable[ndarray], x0:float=0, dx:float=1, dataType=None ):
+    """
+    Write equal length arrays as channels of one file, e.g. the I/Q from QAM.SSB.
+    """
+    channels = [ asarray(channel) for channel in channels ]
+    if dataType is None: dataType = channels[0].dtype
+    with WaveformWriter( path, len(channels), dataType, x0, dx ) as writer:
+        writer.append( channels )
+
+def load_waveform( path:str, mode:str="r" )->Waveform:
+    """
+    Open the waveform file as Waveform without copying, Y is a memory map of the file.\n
+    mode: "r" read only, "r+" writable, "c" copy on write\n
+    Y is in shape (points,) for one channel, (channels, points) otherwise.
+    """
+    header = read_header(path)
+    channels = header["channels"]
+    points = header["points"]
+    if points == 0:
+        Y = empty((channels, 0), dtype=header["dtype"])
+    else:
+        Y = memmap( path, dtype=header["dtype"], mode=mode, offset=HEADER_SIZE, shape=(points, channels) ).T
+    if channels == 1: Y = Y[0]
+    return Waveform( header["x0"], header["dx"], Y )
@@ -0,0 +1,74 @@
+import unittest
+
+from numpy import array_equal, isnan
+from multiprocessing import shared_memory
+from pulse_signal.pulse import QAM
+from pulse_signal.batch import compile_batch
+from sequence_factory import give_pulse
+
+
+def give_sequences( count ):
+	return [ [ give_pulse( 20+2*index, (0.1*(index+1), 5, 10+index, 0, 0.5), startPoint, 5 ) for startPoint in (5+index, "") ] for index in range(count) ]
+
+
+class Test_compile_batch(unittest.TestCase):
+
+	def setUp(self):
+		self.sequences = give_sequences(6)
+		self.freqs = [0.1, 0.05, -0.1, 0.2, 0.15, 0.01]
+		self.mixers = [ (1,90,0,0), (0.9,85,0.01,-0.02) ]*3
+
+	def test_processes(self):
+		with compile_batch( self.sequences, 200, freqIF=0.1, IQMixer=(0.9,85,0.01,-0.02), processes=1 ) as serial:
+			with compile_batch( self.sequences, 200, freqIF=0.1, IQMixer=(0.9,85,0.01,-0.02), processes=3 ) as pool:
+				self.assertTrue(array_equal(serial.envelopes, pool.envelopes))
+				self.assertTrue(array_equal(serial.signal_I, pool.signal_I))
+				self.assertTrue(array_equal(serial.signal_Q, pool.signal_Q))
+				self.assertTrue(array_equal(serial.freqs_LO, pool.freqs_LO))
+			for index, pulses in enumerate(self.sequences):
+				qam = QAM( 1, 200 )
+				_, envelope = qam.give_RFenvelope_IFfrequency( pulses )
+				self.assertTrue(array_equal(serial.envelopes[index], envelope))
+		with compile_batch( self.sequences, 200, processes=2 ) as result:
+			self.assertIsNone(result.signal_I)
+			self.assertTrue(isnan(result.freqs_LO).all())
+
+	def test_each_setting(self):
+		with compile_batch( self.sequences, 200, freqIF=self.freqs, IQMixer=self.mixers, processes=2 ) as result:
+			for index, pulses in enumerate(self.sequences):
+				qam = QAM( 1, 200 )
+				_, envelope = qam.give_RFenvelope_IFfrequency( pulses )
+				signal_I, signal_Q, freq_LO = qam.SSB( self.freqs[index], envelope, IQMixer=self.mixers[index] )
+				self.assertTrue(array_equal(result.signal_I[index], signal_I))
+				self.assertTrue(array_equal(result.signal_Q[index], signal_Q))
+				self.assertEqual(result.freqs_LO[index], freq_LO)
+		with self.assertRaises(ValueError):
+			compile_batch( self.sequences, 200, freqIF=self.freqs[:2], processes=1 )
+
+	def test_close(self):
+		result = compile_batch( self.sequences, 200, freqIF=0.1, processes=2 )
+		names = [ name for name, _, _ in result.blockInfo ]
+		self.assertEqual(len(names), 2)
+		result.close()
+		self.assertIsNone(result.envelopes)
+		for name in names:
+			with self.assertRaises(FileNotFoundError):
+				shared_memory.SharedMemory(name=name)
+
+	def test_close_with_view(self):
+		result = compile_batch( self.sequences, 200, freqIF=0.1, processes=1 )
+		names = [ name for name, _, _ in result.blockInfo ]
+		# an exported buffer of the first block keeps it open
+		view = memoryview( result.envelopes.base )
+		with self.assertRaises(BufferError):
+			result.close()
+		# every block is unlinked although the first one is still open
+		for name in names:
+			with self.assertRaises(FileNotFoundError):
+				shared_memory.SharedMemory(name=name)
+		del view
+		result.close()
+
+
+if __name__ == '__main__':
+	unittest.main()
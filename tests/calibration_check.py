@@ -0,0 +1,44 @@
+import unittest
+
+from numpy import allclose, arange, exp, pi, array, linspace
+from numpy.random import default_rng
+from pulse_signal.digital_mixer import upConversion_IQ, upConversion_RF
+from pulse_signal.calibration import give_mixerGrid, give_sidebandAmplitudes
+
+
+HARDWARE = (0.95,87,0.02,-0.01)
+
+def give_bruteForce( envelope, IQMixer, freq_IF, freq_LO, hardware ):
+	I, Q = upConversion_IQ( envelope, freq_IF, IQMixer )
+	signal_RF = upConversion_RF( I, Q, freq_LO, hardware )
+	time = arange(envelope.shape[0])
+	return [ abs((signal_RF *exp(-2j*pi*freq*time)).sum()) *2/envelope.shape[0] for freq in (freq_LO, freq_LO+freq_IF, freq_LO-freq_IF) ]
+
+
+class Test_sidebandAmplitudes(unittest.TestCase):
+
+	def test_grid(self):
+		grid = give_mixerGrid( [0.9,1,1.1], [-95,85,90], [0,0.02], [-0.01,0.03] )
+		self.assertEqual(grid.shape, (36,4))
+		self.assertTrue(allclose(grid[1], (0.9,-95,0,0.03)))
+
+	def test_brute_force(self):
+		rng = default_rng(6)
+		envelope = exp(-linspace(-2,2,700)**2) *(0.5+0.3j) +0.01*rng.normal(size=700)
+		mixers = give_mixerGrid( [0.9,1.05], [-93,86], [0,0.02], [-0.01,0.01] )
+		for freq_IF, freq_LO in ((0.05,0.2), (-0.037,0.31)):
+			amplitudes = give_sidebandAmplitudes( mixers, freq_IF, freq_LO, envelope, hardware=HARDWARE )
+			for index, mixer in enumerate(mixers):
+				expected = give_bruteForce( envelope, mixer, freq_IF, freq_LO, HARDWARE )
+				self.assertTrue(allclose(array(amplitudes)[:,index], expected, rtol=1e-9, atol=1e-12))
+
+	def test_calibrated(self):
+		carrier, sideband, image = give_sidebandAmplitudes( HARDWARE, 0.05, 0.2, 0.3+0.4j, 1000, HARDWARE )
+		self.assertTrue(allclose((carrier, sideband, image), (0, 0.5, 0), atol=1e-12))
+		carrier, sideband, image = give_sidebandAmplitudes( [(1,90,0,0), HARDWARE], 0.05, 0.2, hardware=HARDWARE )
+		self.assertGreater(image[0], 1e-3)
+		self.assertGreater(carrier[0], 1e-3)
+
+
+if __name__ == '__main__':
+	unittest.main()
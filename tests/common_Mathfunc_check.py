@@ -0,0 +1,65 @@
+import unittest
+
+from numpy import array_equal, linspace, empty, array, errstate, complex64
+from numpy.random import default_rng
+from pulse_signal.common_Mathfunc import DRAGFunc, DRAGFunc_Hermite, GERPFunc
+from pulse_signal.common_Mathfunc import DRAGFunc_fused, DRAGFunc_Hermite_fused, GERPFunc_fused, FUSED_BLOCK_POINTS
+from pulse_signal.common_Mathfunc import GERPFunc_auto, GERP_FUSED_MIN_POINTS
+
+
+class Test_fused(unittest.TestCase):
+
+	def setUp(self):
+		self.rng = default_rng(7)
+		# more than one block
+		self.t = linspace(0, 200, 2*FUSED_BLOCK_POINTS+123)
+
+	def test_DRAG(self):
+		for _ in range(10):
+			p = (self.rng.normal(), self.rng.uniform(0.5,50), self.rng.uniform(0,200), self.rng.normal(), self.rng.normal())
+			self.assertTrue(array_equal(DRAGFunc_fused(self.t, *p), DRAGFunc(self.t, *p)))
+		t = linspace(0, 40, 41)
+		with errstate(divide="ignore", invalid="ignore"):
+			self.assertTrue(array_equal(DRAGFunc_fused(t, 1, 0., 20, 0, 0.5), DRAGFunc(t, 1, 0., 20, 0, 0.5), equal_nan=True))
+
+	def test_DRAG_sweep(self):
+		t = linspace(0, 40, 41)
+		sigma = array([[0.],[4.],[10.]])
+		with errstate(divide="ignore", invalid="ignore"):
+			self.assertTrue(array_equal(DRAGFunc_fused(t, 1, sigma, 20, 0, 0.5), DRAGFunc(t, 1, sigma, 20, 0, 0.5), equal_nan=True))
+
+	def test_DRAG_Hermite(self):
+		for _ in range(10):
+			p = (self.rng.uniform(1,2), self.rng.uniform(2,5), self.rng.uniform(2,5), self.rng.uniform(0,200), self.rng.normal())
+			self.assertTrue(array_equal(DRAGFunc_Hermite_fused(self.t, *p), DRAGFunc_Hermite(self.t, *p)))
+		alpha = array([[2.],[4.]])
+		self.assertTrue(array_equal(DRAGFunc_Hermite_fused(self.t, 1.67, alpha, 4, 100, 0.5), DRAGFunc_Hermite(self.t, 1.67, alpha, 4, 100, 0.5)))
+
+	def test_GERP(self):
+		for _ in range(10):
+			p = (self.rng.normal(), self.rng.uniform(50,150), self.rng.uniform(0,40), self.rng.uniform(5,20), self.rng.uniform(1,8))
+			self.assertTrue(array_equal(GERPFunc_fused(self.t, *p), GERPFunc(self.t, *p)))
+			# unsorted and negative time
+			t = self.rng.uniform(-50, 250, 500)
+			self.assertTrue(array_equal(GERPFunc_fused(t, *p), GERPFunc(t, *p)))
+
+	def test_out(self):
+		out = empty(self.t.shape[0], dtype=complex)
+		result = DRAGFunc_fused(self.t, 1, 20, 100, 0, 0.5, out=out)
+		self.assertIs(result, out)
+		self.assertTrue(array_equal(out, DRAGFunc(self.t, 1, 20, 100, 0, 0.5)))
+		self.assertEqual(DRAGFunc_fused(self.t, 1, 20, 100, 0, 0.5, dtype=complex64).dtype, complex64)
+		out = empty(self.t.shape[0])
+		self.assertIs(GERPFunc_fused(self.t, 1, 150, 20, 10, 4, out=out), out)
+
+	def test_auto(self):
+		# plain GERP for short envelopes, fused kernel for long ones, same results
+		for points in (40, GERP_FUSED_MIN_POINTS):
+			t = linspace(0, 40, points)
+			self.assertTrue(array_equal(GERPFunc_auto(t, 1, 40, 0, 8, 4), GERPFunc(t, 1, 40, 0, 8, 4)))
+		self.assertEqual(GERPFunc_auto(t[:40], 1, 40, 0, 8, 4, dtype=complex64).dtype, complex64)
+		out = empty(40)
+		self.assertIs(GERPFunc_auto(t[:40], 1, 40, 0, 8, 4, out=out), out)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from numpy import array, array_equal, empty, zeros, int8, int16, int32, float64, nan, linspace
+from pulse_signal.dac import quantize, quantize_IQ, give_codeType, give_codeRange
+
+
+class Test_quantize(unittest.TestCase):
+
+	def test_rounding(self):
+		codes, clips = quantize( [0, 0.5, -0.5, 1, -1, 0.1/127, 0.6/127], bits=8 )
+		self.assertEqual(codes.dtype, int8)
+		self.assertTrue(array_equal(codes, [0, 64, -64, 127, -127, 0, 1]))
+		self.assertEqual(clips, 0)
+		codes, _ = quantize( [0.25, -2.], bits=12, fullScale=2. )
+		self.assertEqual(codes.dtype, int16)
+		self.assertTrue(array_equal(codes, [256, -2047]))
+
+	def test_overflow(self):
+		signal = array([0.2, 1.5, -1.5, -1.02, 0.99])
+		codes, clips = quantize( signal, bits=8, blockPoints=2 )
+		self.assertTrue(array_equal(codes, [25, 127, -128, -128, 126]))
+		self.assertEqual(clips, 3)
+		with self.assertRaises(OverflowError):
+			quantize( signal, bits=8, overflow="error" )
+		self.assertEqual(quantize( signal[[0,4]], bits=8, overflow="error" )[1], 0)
+		with self.assertRaises(ValueError):
+			quantize( signal, bits=8, overflow="wrap" )
+
+	def test_invalid(self):
+		with self.assertRaises(ValueError):
+			quantize( [0.1, nan], bits=16 )
+		# out buffer narrower than the bits
+		with self.assertRaises(ValueError):
+			quantize( [0.1, 0.2], bits=16, out=empty(2, dtype=int8) )
+		with self.assertRaises(ValueError):
+			quantize( [0.1, 0.2], bits=16, out=empty(2, dtype=float64) )
+		codes, _ = quantize( [0.1, 0.2], bits=16, out=empty(2, dtype=int32) )
+		self.assertTrue(array_equal(codes, [3277, 6553]))
+		for bits in (1, 54, 64):
+			self.assertRaises(ValueError, give_codeType, bits)
+		self.assertEqual(give_codeRange( 53 ), (-2**52, 2**52-1))
+		codes, _ = quantize( [1., -1.], bits=53 )
+		self.assertEqual(codes.tolist(), [2**52-1, -(2**52-1)])
+
+	def test_IQ(self):
+		signal_I = linspace(-0.5, 0.5, 5)
+		signal_Q = array([0, 0.25, 2, -0.25, 0])
+		codes, clips = quantize_IQ( signal_I, signal_Q, bits=8 )
+		self.assertTrue(array_equal(codes, [-64, 0, -32, 32, 0, 127, 32, -32, 64, 0]))
+		self.assertEqual(clips, 1)
+		out = zeros((2,2,5), dtype=int16)
+		codes, _ = quantize_IQ( [signal_I]*2, [signal_Q]*2, bits=8, interleave=False, out=out )
+		self.assertIs(codes, out)
+		self.assertTrue(array_equal(out[1,1], [0, 32, 127, -32, 0]))
+		with self.assertRaises(ValueError):
+			quantize_IQ( signal_I, signal_Q, bits=16, out=zeros(10, dtype=int8) )
+
+
+if __name__ == '__main__':
+	unittest.main()
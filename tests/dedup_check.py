@@ -0,0 +1,46 @@
+import unittest
+
+from numpy import array_equal, zeros, ones, complex128, concatenate
+from pulse_signal.pulse import QAM
+from pulse_signal.dedup import WaveformTable, expand_table, give_blockTable, give_digest
+from sequence_factory import give_pulses
+
+
+class Test_dedup(unittest.TestCase):
+
+	def test_segment_table(self):
+		# repeated gates back to back, an overlapped pulse and a gap
+		pulses = give_pulses([(20,0),(20,20),(20,40),(40,100),(20,130),(20,300)])
+		qam = QAM( 1, 400 )
+		_, sequence = qam.give_RFenvelope_IFfrequency( pulses )
+		table = qam.give_RFTable( pulses )
+		self.assertEqual(len(table.waveforms), 2)
+		self.assertEqual(table.table.tolist(), [(0,0,3), (1,100,1), (0,130,1), (0,300,1)])
+		self.assertTrue(array_equal(table.expand(), sequence))
+		self.assertLess(table.nbytes, table.denseBytes)
+
+	def test_block_table(self):
+		pulses = give_pulses([(16,32),(16,48),(16,96)])
+		qam = QAM( 1, 1000 )
+		_, sequence = qam.give_RFenvelope_IFfrequency( pulses )
+		table = qam.give_RFTable( pulses, blockPoints=16 )
+		# zeros, the pulse and the last short block
+		self.assertEqual(len(table.waveforms), 3)
+		self.assertEqual(table.table["repeat"].tolist(), [2, 2, 2, 1, 55, 1])
+		self.assertTrue(array_equal(table.expand(), sequence))
+		out = ones(1000, dtype=complex128)
+		self.assertIs(expand_table(table.waveforms, table.table, 1000, out=out), out)
+		self.assertTrue(array_equal(out, sequence))
+
+	def test_bit_identical(self):
+		table = WaveformTable( 8, float )
+		table.add( 0, zeros(2) )
+		table.add( 2, -zeros(2) )  # -0. is a different waveform
+		self.assertEqual(len(table.waveforms), 2)
+		self.assertNotEqual(give_digest(zeros(2)), give_digest(zeros(2, dtype=complex128)))
+		self.assertRaises(IndexError, table.add, 6, zeros(4))
+		self.assertTrue(array_equal(give_blockTable(concatenate([zeros(4), ones(4)]), 4).expand(), concatenate([zeros(4), ones(4)])))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+
+from numpy import allclose, empty, linspace, exp, arange, cos, pi, radians, full, real, newaxis
+from numpy.random import default_rng
+from fractions import Fraction
+from pulse_signal.digital_mixer import upConversion_IQ, upConversion_RF, upConversion_IQ_channels, downConversion
+from pulse_signal.nco import NCOCache
+
+
+MIXERS = [ (1,90,0,0), (0.9,85,0.01,-0.02), (1.1,-95,0.03,0), (1,-90,0,0) ]
+
+class Test_upConversion_IQ(unittest.TestCase):
+
+	def test_fast_same_as_direct(self):
+		rng = default_rng(0)
+		envelope = rng.normal(size=(3,200)) +1j*rng.normal(size=(3,200))
+		for mixer in MIXERS:
+			for suppress in (True, False):
+				direct = upConversion_IQ( envelope[0], 0.013, mixer, suppress )
+				fast = upConversion_IQ( envelope[0], 0.013, mixer, suppress, fast=True )
+				self.assertTrue(allclose(direct, fast, rtol=0, atol=1e-12))
+			direct = upConversion_IQ( envelope, [0.01,-0.02,0.03], mixer )
+			fast = upConversion_IQ( envelope, [0.01,-0.02,0.03], mixer, fast=True )
+			self.assertTrue(allclose(direct, fast, rtol=0, atol=1e-12))
+
+	def test_out_buffer(self):
+		envelope = exp(1j*linspace(0,3,100))
+		out = empty((2,100))
+		signal_I, signal_Q = upConversion_IQ( envelope, 0.05, MIXERS[1], fast=True, out=out )
+		self.assertIs(signal_I.base, out)
+		self.assertTrue(allclose(out, upConversion_IQ( envelope, 0.05, MIXERS[1] )))
+		with self.assertRaises(ValueError):
+			upConversion_IQ( envelope, 0.05, MIXERS[1], fast=True, out=empty((2,50)) )
+
+	def test_channels(self):
+		rng = default_rng(2)
+		envelopes = rng.normal(size=(4,150)) +1j*rng.normal(size=(4,150))
+		freqs = [0.01,-0.02,0.1,0.05]
+		signal_I, signal_Q = upConversion_IQ_channels( envelopes, freqs, MIXERS )
+		self.assertEqual(signal_I.shape, (4,150))
+		for channel in range(4):
+			expected = upConversion_IQ( envelopes[channel], freqs[channel], MIXERS[channel] )
+			self.assertTrue(allclose((signal_I[channel], signal_Q[channel]), expected, rtol=0, atol=1e-12))
+
+
+class Test_NCO(unittest.TestCase):
+
+	def test_period_table(self):
+		cache = NCOCache(maxEntries=2)
+		self.assertEqual(cache.give_period(0.013, 5000), Fraction(13,1000))
+		self.assertIsNone(cache.give_period(0.013, 500))
+		table = cache.give_phasor(0.013, 5000, 0.2)
+		self.assertTrue(allclose(table, exp(1j*(2*pi*0.013*arange(5000)+0.2)), rtol=0, atol=1e-10))
+		self.assertIs(cache.give_phasor(0.013, 5000, 0.2), table)
+		self.assertFalse(table.flags.writeable)
+
+	def test_upConversion_RF(self):
+		rng = default_rng(1)
+		I, Q = rng.normal(size=(2,3000))
+		time = arange(3000)
+		for mixer in MIXERS:
+			expected = (I+mixer[2])*cos(2*pi*0.2*time) +(Q+mixer[3])*mixer[0]*cos(2*pi*0.2*time +radians(mixer[1]))
+			self.assertTrue(allclose(upConversion_RF(I, Q, 0.2, mixer), expected, rtol=0, atol=1e-9))
+
+
+class Test_downConversion(unittest.TestCase):
+
+	def setUp(self):
+		rng = default_rng(4)
+		self.amplitudes = rng.normal(size=(500,2)) @ [1,1j]
+		self.time = arange(400)
+		self.records = real( self.amplitudes[:,newaxis] *exp(2j*pi*0.05*self.time) ) +0.2*cos(2*pi*0.15*self.time)
+
+	def test_tones(self):
+		self.assertTrue(allclose(downConversion( self.records, 0.05, blockShots=64 ), self.amplitudes))
+		demodulated = downConversion( self.records, [0.05,0.15,0.1] )
+		self.assertEqual(demodulated.shape, (500,3))
+		self.assertTrue(allclose(demodulated[:,0], self.amplitudes))
+		self.assertTrue(allclose(demodulated[:,1], 0.2))
+		self.assertTrue(allclose(demodulated[:,2], 0))
+		self.assertTrue(allclose(downConversion( self.records[7], 0.05 ), self.amplitudes[7]))
+		# ideal mixer I+iQ is the envelope times phasor
+		signal_I, signal_Q = upConversion_IQ( full(400, 0.3+0.2j), 0.05, offset=100 )
+		self.assertTrue(allclose(downConversion( signal_I +1j*signal_Q, 0.05, offset=100 ), 0.3+0.2j))
+
+	def test_weights(self):
+		rng = default_rng(5)
+		weights = rng.normal(size=(2,400)) +1j*rng.normal(size=(2,400))
+		out = empty((500,2), dtype=complex)
+		demodulated = downConversion( self.records, [0.05,0.15], weights, offset=3, out=out )
+		self.assertIs(demodulated, out)
+		expected = [ [ (weights[k] *record *exp(-2j*pi*freq*(self.time+3))).sum() for k, freq in enumerate((0.05,0.15)) ] for record in self.records ]
+		self.assertTrue(allclose(demodulated, expected))
+		with self.assertRaises(ValueError):
+			downConversion( self.records, [0.05,0.15], out=empty((500,2)) )
+
+
+if __name__ == '__main__':
+	unittest.main()
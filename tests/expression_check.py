@@ -0,0 +1,60 @@
+import unittest
+
+from numpy import allclose, array_equal, arange, exp, zeros
+from pulse_signal.pulse import QAM, get_Pulse_DRAG
+from pulse_signal.waveform import Waveform
+from pulse_signal.expression import PulseExpression, PulseTerm, Sum, as_expression, give_sequenceExpression
+from sequence_factory import give_pulses
+
+
+class Test_PulseExpression(unittest.TestCase):
+
+	def test_sequence_window(self):
+		# overlapped and concatenated pulses
+		pulses = give_pulses([(20,""),(40,10),(30,""),(16,5),(24,300),(12,"")])
+		_, envelope = QAM( 0.5, 400 ).give_RFenvelope_IFfrequency( pulses )
+		expression = give_sequenceExpression( pulses, 0.5, 400 )
+		self.assertTrue(array_equal(expression.evaluate( 0, 200, 0.5 ).Y, envelope))
+		for tStart, tStop in ((3, 17.5), (21, 60), (149.5, 170), (100, 140)):
+			window = expression.evaluate( tStart, tStop, 0.5 )
+			self.assertEqual(window.x0, tStart)
+			self.assertTrue(array_equal(window.Y, envelope[int(tStart*2):int(tStop*2)]))
+
+	def test_not_rendered(self):
+		pulses = give_pulses([(20,5),(40,""),(30,100)])
+		def failed( t, *p ): raise AssertionError("pulse out of window is calculated")
+		pulses[2].envelopeFunc = failed
+		expression = give_sequenceExpression( pulses, 1, 200 )
+		self.assertEqual(expression.support, (5, 130))
+		self.assertEqual(expression.give_overlapped( 30, 60 ), [1])
+		expression.evaluate( 0, 90, 1 )
+
+	def test_composition(self):
+		pulse = get_Pulse_DRAG( 20, (1,5,10,0,0.5) )
+		envelope = pulse.generate_envelope( 0, 1 ).Y
+		waveform = Waveform( 0, 1, arange(8)*1j )
+		expression = 2*PulseTerm( pulse, 1 ).shift( 3 ) +as_expression( waveform, startTime=25 ).rotate( 0.3 ) -PulseTerm( pulse, 1, 10 )
+		self.assertEqual(expression.support, (3, 33))
+		expected = zeros(40, dtype=complex)
+		expected[3:23] += 2*envelope
+		expected[25:33] += exp(0.3j)*waveform.Y
+		expected[10:30] -= envelope
+		self.assertTrue(allclose(expression.evaluate( 0, 40, 1 ).Y, expected))
+		# nested sums are flattened
+		self.assertEqual(len((expression +PulseTerm( pulse, 1 )).terms), 4)
+		# a pulse evaluated on another grid
+		fine = PulseTerm( pulse, 1 ).evaluate( 0, 20, 0.25 ).Y
+		self.assertTrue(allclose(fine[::4], envelope))
+
+	def test_empty_and_outside(self):
+		empty = Sum([])
+		self.assertEqual(empty.support, (0, 0))
+		self.assertTrue(array_equal(empty.evaluate( 0, 10, 1 ).Y, zeros(10)))
+		expression = PulseTerm( get_Pulse_DRAG( 20, (1,5,10,0,0.5) ), 1, 50 ) +PulseTerm( get_Pulse_DRAG( 20, (1,5,10,0,0.5) ), 1, 100 )
+		for tStart, tStop in ((0, 50), (70, 100), (120, 200)):
+			self.assertTrue(array_equal(expression.evaluate( tStart, tStop, 1 ).Y, zeros(tStop-tStart)))
+		self.assertRaises(TypeError, PulseExpression)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from numpy import allclose, convolve, concatenate, array_split, arange, exp, ones, diff
+from numpy.random import default_rng
+from pulse_signal.filter import FIRFilter, get_ExponentialCorrection, FilterChain, iter_filtered
+from pulse_signal.pulse import QAM, get_Pulse_DRAG
+from pulse_signal.waveform import Waveform
+
+
+class Test_FIRFilter(unittest.TestCase):
+
+	def setUp(self):
+		rng = default_rng(3)
+		self.signal = rng.normal(size=20011) +1j*rng.normal(size=20011)
+		self.kernels = [ rng.normal(size=points) for points in (1, 16, 65, 700) ]
+
+	def test_apply(self):
+		for kernel in self.kernels:
+			expected = convolve(self.signal, kernel)[:self.signal.shape[0]]
+			for method in ("auto", "direct", "fft"):
+				self.assertTrue(allclose(FIRFilter(kernel, method).apply(self.signal), expected))
+			self.assertTrue(allclose(FIRFilter(kernel, "fft").apply(self.signal.real), expected.real))
+
+	def test_stream(self):
+		for kernel in self.kernels:
+			expected = convolve(self.signal, kernel)[:self.signal.shape[0]]
+			for method in ("direct", "fft"):
+				fir = FIRFilter(kernel, method)
+				chunks = array_split(self.signal, [0, 3, 500, 501, 9000, 20000])
+				self.assertTrue(allclose(concatenate([ fir.process(chunk) for chunk in chunks ]), expected))
+			# kernel FFT is cached for each chunk size
+			self.assertGreater(len(fir._spectra), 1)
+
+	def test_invalid(self):
+		self.assertRaises(ValueError, FIRFilter, [], "fft")
+		self.assertRaises(ValueError, FIRFilter, ones(100), "fft", 128)
+		self.assertRaises(ValueError, FIRFilter, ones(3), "slow")
+
+
+class Test_IIRFilter(unittest.TestCase):
+
+	def test_exponential_correction(self):
+		n = arange(3000)
+		# step response of two distortions in cascade
+		impulse = diff( 1 +0.2*exp(-n/100.), prepend=0 )
+		step = convolve( impulse, 1 -0.1*exp(-n/30.) )[:n.shape[0]]
+		correction = get_ExponentialCorrection([(0.2, 100.), (-0.1, 30.)])
+		self.assertTrue(allclose(correction.apply(step), 1))
+		self.assertRaises(ValueError, get_ExponentialCorrection, [(-1, 10.)])
+
+	def test_chain_stream(self):
+		pulses = []
+		for startPoint in (10, 300, 2000):
+			pulse = get_Pulse_DRAG( 40, (1, 10, 20, 0, 0.5) )
+			pulse.startPoint = startPoint
+			pulses.append(pulse)
+		qam = QAM( 1, 4000 )
+		_, envelope = qam.give_RFenvelope_IFfrequency( pulses )
+		chain = FilterChain([ get_ExponentialCorrection([(0.2, 100.)]), FIRFilter(default_rng(0).normal(size=200)) ])
+		expected = chain.apply( envelope )
+		chunks = list(iter_filtered( chain, qam.iter_RFenvelope( pulses, 512 ) ))
+		self.assertIsInstance(chunks[0], Waveform)
+		self.assertTrue(allclose(concatenate([ chunk.Y for chunk in chunks ]), expected))
+
+
+if __name__ == '__main__':
+	unittest.main()
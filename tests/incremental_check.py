@@ -0,0 +1,61 @@
+import unittest
+
+from numpy import array_equal, allclose
+from pulse_signal.pulse import QAM
+from pulse_signal.incremental import IncrementalSequence
+from sequence_factory import give_pulses
+
+
+def give_full( pulses, totalPoints ):
+	qam = QAM( 1, totalPoints )
+	_, envelope = qam.give_RFenvelope_IFfrequency( pulses )
+	signal_I, signal_Q = qam.SSB( 0.1, envelope, IQMixer=(0.9,85,0.01,-0.02) )[:2]
+	return envelope, signal_I, signal_Q
+
+
+class Test_IncrementalSequence(unittest.TestCase):
+
+	def setUp(self):
+		# overlapped pulses and concatenated pulses
+		self.pulses = give_pulses([(20,5),(40,""),(30,50),(16,""),(24,300)], 5)
+		self.sequence = IncrementalSequence( self.pulses, 1, 400, 0.1, (0.9,85,0.01,-0.02) )
+
+	def check_full(self):
+		envelope, signal_I, signal_Q = give_full( self.pulses, 400 )
+		self.assertTrue(array_equal(self.sequence.envelope, envelope))
+		self.assertTrue(array_equal(self.sequence.signal_I, signal_I))
+		self.assertTrue(array_equal(self.sequence.signal_Q, signal_Q))
+
+	def test_build(self):
+		self.check_full()
+		self.assertEqual(self.sequence.spans, [(5,25),(25,65),(50,80),(80,96),(300,324)])
+		self.assertEqual(self.sequence.freq_LO, 4.9)
+
+	def test_update(self):
+		# overlapped with pulse 1
+		self.assertEqual(self.sequence.update( 2, (0.3,7.5,15,0,0.2) ), (50,80))
+		self.check_full()
+		self.assertEqual(self.sequence.update( 4, carrierPhase=1.2 ), (300,324))
+		self.check_full()
+		self.pulses[0].parameters = (0.5,5,10,0,-0.5)
+		self.assertEqual(self.sequence.refresh( 0 ), (5,25))
+		self.check_full()
+
+	def test_rebuild(self):
+		# longer pulse moves the concatenated pulses
+		self.pulses[0].duration = 30
+		self.assertEqual(self.sequence.refresh( 0 ), (0,400))
+		self.check_full()
+		self.assertEqual(self.sequence.spans[1], (35,75))
+
+	def test_fast(self):
+		sequence = IncrementalSequence( self.pulses, 1, 400, 0.1, (0.9,85,0.01,-0.02), fast=True )
+		sequence.update( 3, (0.3,4,8,0,0.2) )
+		envelope, signal_I, signal_Q = give_full( self.pulses, 400 )
+		self.assertTrue(array_equal(sequence.envelope, envelope))
+		self.assertTrue(allclose(sequence.signal_I, signal_I))
+		self.assertTrue(allclose(sequence.signal_Q, signal_Q))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+from numpy import linspace
+from pulse_signal.instrument import Collector, add_hook, remove_hook, is_enabled
+from pulse_signal.pulse import QAM
+from pulse_signal.digital_mixer import upConversion_IQ
+from pulse_signal.pulseScript import give_waveformInfo
+from sequence_factory import give_pulse
+
+
+class Test_instrument(unittest.TestCase):
+
+	def test_collector(self):
+		pulses = [ give_pulse( 40, (0.5, 10, 20, 0, 0.5), "", 5 ) for _ in range(3) ]
+		with Collector() as collector:
+			give_waveformInfo("drag/4/0.5/", 40, 0.8)
+			_, envelope = QAM( 1, 200 ).give_RFenvelope_IFfrequency( pulses )
+			upConversion_IQ( envelope, 0.1 )
+		self.assertFalse(is_enabled())
+		statistics = collector.give_statistics()
+		self.assertEqual(statistics["parse"]["calls"], 1)
+		self.assertEqual(statistics["envelope"]["calls"], 3)
+		self.assertEqual(statistics["envelope"]["samples"], 3*40)
+		self.assertEqual(statistics["assembly"]["calls"], 1)
+		self.assertEqual(statistics["assembly"]["nbytes"], 200*16)
+		self.assertEqual(statistics["upconversion"]["samples"], 2*200)
+		self.assertGreater(statistics["assembly"]["time"], 0)
+		self.assertIn("envelope", collector.give_report())
+
+		# nothing is collected after stop
+		QAM( 1, 200 ).give_RFenvelope_IFfrequency( pulses )
+		self.assertEqual(collector.give_statistics()["assembly"]["calls"], 1)
+
+	def test_hook(self):
+		calls = []
+		hook = lambda stage, name, seconds, samples, nbytes: calls.append( (stage, name, samples) )
+		add_hook(hook)
+		try:
+			self.assertTrue(is_enabled())
+			upConversion_IQ( linspace(0, 1, 50), 0.1 )
+		finally:
+			remove_hook(hook)
+		self.assertFalse(is_enabled())
+		self.assertEqual(calls, [ ("upconversion", "upConversion_IQ", 100) ])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+
+import asyncio
+import os
+import tempfile
+import time
+from numpy import array_equal
+from pulse_signal.pipeline import WaveformSink, SequenceRenderer, FakeInstrumentSink, FileSink, run_pipeline
+from pulse_signal.waveform_file import load_waveform
+from sequence_factory import give_pulse
+
+
+def give_sequences( count ):
+	return [ [ give_pulse( 40, (0.1*(shot+1), 10, 20, 0, 0.5), 10, 5 ) ] for shot in range(count) ]
+
+
+class Test_pipeline(unittest.TestCase):
+
+	def test_order_and_data(self):
+		render = SequenceRenderer( 200, 1, 0.1, (0.9,85,0.01,-0.02) )
+		sequences = give_sequences(5)
+		sink = FakeInstrumentSink( 0.001 )
+		self.assertEqual(asyncio.run( run_pipeline( sequences, sink, render ) ), 5)
+		self.assertTrue(sink.closed)
+		self.assertEqual([ shot.index for shot in sink.shots ], list(range(5)))
+		for index, shot in enumerate(sink.shots):
+			expected = render( index, sequences[index] )
+			self.assertTrue(array_equal(shot.signal_I, expected.signal_I))
+			self.assertTrue(array_equal(shot.signal_Q, expected.signal_Q))
+			self.assertEqual(shot.freq_LO, 4.9)
+
+	def test_backpressure(self):
+		rendered = []
+		sink = FakeInstrumentSink( 0.01 )
+		render = SequenceRenderer( 200 )
+		def counted_render( index, pulses ):
+			# rendering is ahead of sink by at most the queue and one in the worker
+			rendered.append( index -len(sink.shots) )
+			return render( index, pulses )
+		asyncio.run( run_pipeline( give_sequences(6), sink, counted_render, queueSize=1 ) )
+		self.assertLessEqual(max(rendered), 2)
+
+	def test_overlap(self):
+		def slow_render( index, job ):
+			time.sleep(0.05)
+			return SequenceRenderer( 10 )( index, [] )
+		start = time.perf_counter()
+		asyncio.run( run_pipeline( range(6), FakeInstrumentSink( 0.05 ), slow_render ) )
+		# serial would take 6*(0.05+0.05)
+		self.assertLess(time.perf_counter() -start, 0.5)
+
+	def test_render_error(self):
+		def failed_render( index, job ):
+			if index == 2: raise ValueError("bad sequence")
+			return SequenceRenderer( 10 )( index, [] )
+		sink = FakeInstrumentSink()
+		with self.assertRaises(ValueError):
+			asyncio.run( run_pipeline( range(5), sink, failed_render ) )
+		self.assertTrue(sink.closed)
+		self.assertLessEqual(len(sink.shots), 2)
+
+	def test_cancel(self):
+		sink = FakeInstrumentSink( 10 )
+		async def main():
+			task = asyncio.ensure_future( run_pipeline( range(3), sink, lambda index, job: SequenceRenderer( 10 )( index, [] ) ) )
+			await asyncio.sleep(0.05)
+			task.cancel()
+			await task
+		with self.assertRaises(asyncio.CancelledError):
+			asyncio.run( main() )
+		self.assertTrue(sink.closed)
+		self.assertEqual(len(sink.shots), 0)
+
+	def test_file_sink(self):
+		with tempfile.TemporaryDirectory() as directory:
+			render = SequenceRenderer( 200, 1, 0.1 )
+			sequences = give_sequences(3)
+			sink = FileSink( directory )
+			asyncio.run( run_pipeline( sequences, sink, render ) )
+			self.assertEqual(sorted(os.listdir(directory)), [ "shot_%06d.pswf" %i for i in range(3) ])
+			waveform = load_waveform( sink.paths[1] )
+			expected = render( 1, sequences[1] )
+			self.assertTrue(array_equal(waveform.Y[0], expected.signal_I))
+			self.assertTrue(array_equal(waveform.Y[1], expected.signal_Q))
+			del waveform
+
+	def test_abstract_sink(self):
+		class NoSend( WaveformSink ):
+			pass
+		with self.assertRaises(TypeError):
+			NoSend()
+
+
+if __name__ == '__main__':
+	unittest.main()
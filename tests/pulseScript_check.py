@@ -0,0 +1,36 @@
+import unittest
+
+from numpy import array_equal
+from pulse_signal.pulseScript import give_waveformInfo, compile_script
+from pulse_signal import common_Mathfunc as cpf
+
+
+class Test_pulseScript(unittest.TestCase):
+
+	def test_waveformInfo(self):
+		pulse = give_waveformInfo("drag/4/0.5/", 40, 0.8)
+		self.assertIs(pulse.envelopeFunc, cpf.DRAGFunc_fused)
+		self.assertEqual(pulse.duration, 40)
+		self.assertEqual(pulse.carrierPhase, 0)
+		self.assertEqual(list(pulse.parameters), [0.8, 10, 20, 0, 0.5])
+		pulse = give_waveformInfo("gaussup/8", 40, 0.5)
+		self.assertEqual(list(pulse.parameters), [0.5, 10, 40, 0])
+
+	def test_program(self):
+		script = "drag/4/0.5/,40,1\n\ngauss/4,20,0.5\ndrag/4/0.5/,40,0.5\n"
+		program = compile_script(script)
+		self.assertIs(compile_script(script), program)
+		self.assertEqual(len(program), 3)
+		self.assertIs(program.beats[0], program.beats[2])
+		self.assertEqual(program.durations, (40,20,40))
+
+		pulses = program.give_pulses(amplitudes=[0.2,0.3,0.4])
+		for pulse, (beat, width, height) in zip(pulses, [("drag/4/0.5/",40,0.2),("gauss/4",20,0.3),("drag/4/0.5/",40,0.4)]):
+			expected = give_waveformInfo(beat, width, height)
+			self.assertTrue(array_equal(pulse.generate_envelope(0,1).Y, expected.generate_envelope(0,1).Y))
+		with self.assertRaises(ValueError):
+			program.give_pulses(durations=[40])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,179 @@
+import unittest
+
+from numpy import array, zeros, nonzero, max, where, complex128, allclose, array_equal, linspace, concatenate
+from pulse_signal.pulse import QAM, get_Pulse_gauss, get_Pulse_DRAG, pulse_extend
+from pulse_signal.common_Mathfunc import constFunc, DRAGFunc, DRAGFunc_Hermite
+from pulse_signal.gate_library import get_GateLibrary
+from pulse_signal.envelope_cache import enable_envelopeCache, disable_envelopeCache
+from concurrent.futures import ThreadPoolExecutor
+from sequence_factory import give_pulses
+
+
+def reference_RFenvelope( pulses, dt, totalPoints ):
+	# Assembly by extending every pulse to the whole sequence
+	envelope_RF = zeros(totalPoints, dtype=complex128)
+	for pulse in pulses:
+		new_envelope = pulse.generate_envelope( 0, dt ).Y
+		startPoint = pulse.startPoint
+		if startPoint != "":
+			envelope_RF += pulse_extend(new_envelope,int(startPoint),totalPoints)
+		else:
+			try:
+				startPoint = max(nonzero(envelope_RF))
+				if startPoint + 1 + new_envelope.shape[0] > totalPoints:
+					raise IndexError("Un-specified start makes out of sequence!")
+				envelope_RF += pulse_extend(new_envelope,startPoint+1,totalPoints)
+			except(ValueError):
+				envelope_RF += pulse_extend(new_envelope,1,totalPoints)
+	return envelope_RF
+
+
+class Test_QAM_assembly(unittest.TestCase):
+
+	def test_same_as_extend(self):
+		pulses = give_pulses([(20,""),(40,""),(10,100),(30,""),(16,5),(12,"")])
+		pulses.append(get_Pulse_gauss( 8, (0.5,2,4) ))
+		pulses[-1].startPoint = 190
+		_, envelope = QAM(1,200).give_RFenvelope_IFfrequency(pulses)
+		self.assertTrue(array_equal(envelope, reference_RFenvelope(pulses,1,200)))
+
+		envelopeList, sequence = QAM(1,200).give_RFIFDict(pulses)
+		self.assertTrue(array_equal(sequence, envelope))
+		self.assertTrue(allclose(sum(e[0] for e in envelopeList), envelope))
+
+	def test_zero_tail(self):
+		# The concat point follows the last nonzero point, not the written length
+		pulses = give_pulses([(20,"")])
+		tail = get_Pulse_gauss( 10, (0,1,5) )
+		tail.envelopeFunc = constFunc
+		tail.parameters = (0,)
+		tail.startPoint = ""
+		pulses += [tail] +give_pulses([(20,"")])
+		_, envelope = QAM(1,100).give_RFenvelope_IFfrequency(pulses)
+		self.assertTrue(array_equal(envelope, reference_RFenvelope(pulses,1,100)))
+
+	def test_out_of_sequence(self):
+		qam = QAM(1,50)
+		with self.assertRaisesRegex(IndexError, "Un-specified start"):
+			qam.give_RFenvelope_IFfrequency(give_pulses([(30,""),(30,"")]))
+		with self.assertRaisesRegex(IndexError, "out of given total time"):
+			qam.give_RFenvelope_IFfrequency(give_pulses([(40,20)]))
+		with self.assertRaisesRegex(IndexError, "out of given total time"):
+			qam.give_RFenvelope_IFfrequency(give_pulses([(50,"")]))
+
+	def test_segments(self):
+		pulses = give_pulses([(20,""),(10,50),(30,"")])
+		segments, sequence = QAM(1,120).give_RFSegments(pulses)
+		self.assertEqual([s for s,_ in segments], [1,50,60])
+		self.assertTrue(array_equal(segments.give_dense(), sequence))
+		window = segments.give_timeWindow(55,70)
+		self.assertEqual(window.totalPoints, 15)
+		self.assertEqual([(s,e.shape[0]) for s,e in window], [(0,5),(5,10)])
+		self.assertTrue(array_equal(window.give_dense(), sequence[55:70]))
+
+	def test_sweep(self):
+		amps = linspace(0,1,4)
+		ratios = linspace(-1,1,4)
+		pulse = get_Pulse_DRAG( 40, (amps,10,20,0,ratios), carrierFrequency=5, carrierPhase=0.3 )
+		signal_I, signal_Q, _ = pulse.generate_IQSignal_sweep( 0, 1, 0.1, (0.9,85,0.01,0.02) )
+		self.assertEqual(signal_I.Y.shape, (4,40))
+		for i in range(4):
+			point = get_Pulse_DRAG( 40, (amps[i],10,20,0,ratios[i]), carrierFrequency=5, carrierPhase=0.3 )
+			point_I, point_Q, _ = point.generate_IQSignal( 0, 1, 0.1, (0.9,85,0.01,0.02) )
+			self.assertTrue(allclose(signal_I.Y[i], point_I.Y))
+			self.assertTrue(allclose(signal_Q.Y[i], point_Q.Y))
+
+	def test_chunks(self):
+		pulses = give_pulses([(20,""),(40,""),(10,30),(30,""),(16,5)])
+		qam = QAM(0.5,400)
+		_, envelope = qam.give_RFenvelope_IFfrequency(pulses)
+		chunks = list(qam.iter_RFenvelope(pulses, 64))
+		self.assertEqual(chunks[1].x0, 32)
+		self.assertTrue(array_equal(concatenate([chunk.Y for chunk in chunks]), envelope))
+
+		signal_I, signal_Q, _ = qam.SSB( 0.05, envelope, IQMixer=(0.9,85,0.01,0.02) )
+		chunks = list(qam.iter_SSB( 0.05, pulses, 64, IQMixer=(0.9,85,0.01,0.02) ))
+		self.assertTrue(allclose(concatenate([I.Y for I, _ in chunks]), signal_I))
+		self.assertTrue(allclose(concatenate([Q.Y for _, Q in chunks]), signal_Q))
+
+		pulse = pulses[1]
+		pulse.carrierFrequency = 4.8
+		signal = concatenate([chunk.Y for chunk in pulse.iter_signal( 3, 0.001, 700 )])
+		self.assertTrue(allclose(signal, pulse.generate_signal( 3, 0.001 ).Y))
+
+	def test_chunks_hermite(self):
+		# the gate time of the whole pulse is kept for Hermite normalization
+		pulse = get_Pulse_DRAG( 50, (1.67,4,4,25,0.5) )
+		pulse.envelopeFunc = DRAGFunc_Hermite
+		for chunkPoints in (7, 50):
+			chunks = concatenate([chunk.Y for chunk in pulse.iter_envelope( 0, 0.5, chunkPoints )])
+			self.assertTrue(array_equal(chunks, pulse.generate_envelope( 0, 0.5 ).Y))
+
+	def test_startPoints(self):
+		pulses = give_pulses([(20,""),(40,3),(30,""),(16,80)])
+		# the tail is zero, found from the end in chunks
+		pulses[0].parameters = (1,5,5,0,0.5)
+		pulses[0].envelopeFunc = lambda t, *p: where( t < 12, DRAGFunc( t, *p ), 0 )
+		def failed( t, *p ): raise AssertionError("envelope after the last concatenated pulse is calculated")
+		pulses[3].envelopeFunc = failed
+		qam = QAM(1,200)
+		self.assertEqual(qam.give_startPoints( pulses, chunkPoints=3 ), [1,3,43,80])
+		pulses[3].envelopeFunc = DRAGFunc
+		_, envelope = qam.give_RFenvelope_IFfrequency(pulses)
+		self.assertTrue(array_equal(envelope, reference_RFenvelope(pulses,1,200)))
+
+	def test_gate_library(self):
+		gates = { "X": get_Pulse_DRAG( 20, (1,5,10,0,0.5), carrierFrequency=5 ), "X90": get_Pulse_DRAG( 20, (0.5,5,10,0,0.5), carrierFrequency=5 ) }
+		library = get_GateLibrary( gates, dt=1 )
+		library.add_envelope( "I", zeros(10) )
+		names = ["X90","I","X","X90"]
+		self.assertEqual(library.give_points(names), 70)
+
+		qam = QAM(1,100)
+		_, envelope = qam.give_RFenvelope_gates( library, names, startPoint=3 )
+		self.assertEqual(qam.carrierFrequency, 5)
+		pulses = [gates["X90"], gates["X"], gates["X90"]]
+		expected = zeros(100, dtype=complex128)
+		for pulse, startPoint in zip(pulses, [3,33,53]):
+			expected[startPoint:startPoint+20] += pulse.generate_envelope( 0, 1 ).Y
+		self.assertTrue(array_equal(envelope, expected))
+		with self.assertRaises(IndexError):
+			qam.give_RFenvelope_gates( library, names, startPoint=31 )
+
+
+class Test_envelope_cache(unittest.TestCase):
+
+	def tearDown(self):
+		disable_envelopeCache()
+
+	def test_reuse(self):
+		pulses = give_pulses([(20,""),(20,""),(10,70),(20,"")])
+		_, uncached = QAM(1,120).give_RFenvelope_IFfrequency(pulses)
+		cache = enable_envelopeCache(maxEntries=1)
+		_, cached = QAM(1,120).give_RFenvelope_IFfrequency(pulses)
+		self.assertTrue(array_equal(cached, uncached))
+		self.assertEqual(cache.give_statistics()["hits"], 1)
+		self.assertEqual(cache.give_statistics()["evictions"], 2)
+
+		envelope = pulses[0].generate_envelope( 0, 1 ).Y
+		self.assertIs(pulses[1].generate_envelope( 0, 1 ).Y, envelope)
+		with self.assertRaises(ValueError):
+			envelope[0] = 0
+
+	def test_threads(self):
+		# eviction in one thread while others read, the counters stay consistent
+		cache = enable_envelopeCache(maxEntries=4)
+		pulses = give_pulses([ (10+i,"") for i in range(12) ])
+		def render():
+			for _ in range(200):
+				for pulse in pulses: pulse.generate_envelope( 0, 1 )
+		with ThreadPoolExecutor(4) as executor:
+			for future in [ executor.submit(render) for _ in range(4) ]: future.result()
+		statistics = cache.give_statistics()
+		self.assertEqual(statistics["hits"] +statistics["misses"], 4*200*12)
+		self.assertEqual(statistics["entries"], 4)
+		self.assertGreaterEqual(statistics["misses"] -statistics["evictions"], 4)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,13 @@
+from pulse_signal.pulse import get_Pulse_DRAG
+
+
+def give_pulse( duration, parameters=None, startPoint="", carrierFrequency=0 ):
+	""" DRAG pulse, the parameters are scaled with the duration by default """
+	if parameters == None: parameters = (1,duration/4,duration/2,0,0.5)
+	pulse = get_Pulse_DRAG( duration, parameters, carrierFrequency )
+	pulse.startPoint = startPoint
+	return pulse
+
+def give_pulses( settings, carrierFrequency=0 ):
+	""" DRAG pulses of (duration, startPoint) settings """
+	return [ give_pulse( duration, startPoint=startPoint, carrierFrequency=carrierFrequency ) for duration, startPoint in settings ]
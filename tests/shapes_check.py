@@ -0,0 +1,47 @@
+import unittest
+
+from pulse_signal import common_Mathfunc as cpf
+from pulse_signal.shapes import EnvelopeShape, register_shape, give_shape, give_shapeNames, give_scriptShape
+from pulse_signal.pulse import get_Pulse_gauss, get_Pulse_DRAG
+from pulse_signal.pulseScript import give_waveformInfo, compile_script
+
+
+class Test_shapes(unittest.TestCase):
+
+	def test_registry(self):
+		for name in ["flat", "gauss", "gaussup", "gaussdn", "drage", "dragh", "drag", "lin", "gerp", "gaussian"]:
+			self.assertIn(name, give_shapeNames())
+		self.assertIs(give_shape("drag").envelopeFunc, cpf.DRAGFunc_fused)
+		self.assertIs(give_shape("gerp").envelopeFunc, cpf.GERPFunc_auto)
+		self.assertTrue(give_shape("dragh").metadata["complex"])
+		self.assertRaises(KeyError, give_shape, "unknown")
+		# unknown or non-script shape in script is flat
+		self.assertIs(give_scriptShape("unknown"), give_shape("flat"))
+		self.assertIs(give_scriptShape("gaussian"), give_shape("flat"))
+
+	def test_script_values(self):
+		shape = give_shape("drag")
+		self.assertEqual(shape.give_scriptValues([float("nan")]), (4, 1, 0))
+		self.assertEqual(shape.give_scriptValues([3., float("nan"), 90.]), (3., 1, 90.))
+		self.assertEqual(shape.give_parameters(40, 0.5, (4, 1, 0)), [0.5, 10, 20, 0, 1])
+
+	def test_factories(self):
+		self.assertIs(get_Pulse_gauss(40, (1, 10, 20)).envelopeFunc, cpf.gaussianFunc)
+		self.assertIs(get_Pulse_DRAG(40, (1, 10, 20, 0, 0.5)).envelopeFunc, cpf.DRAGFunc_fused)
+
+	def test_register(self):
+		register_shape( EnvelopeShape( "halfflat", "constFunc", ("value",), (0.5,),
+			lambda width, height, values: [height*values[0]] ) )
+		pulse = give_waveformInfo("halfflat/", 40, 0.8)
+		self.assertIs(pulse.envelopeFunc, cpf.constFunc)
+		self.assertEqual(pulse.parameters, [0.4])
+		# replaced shape is used by the scripts compiled before
+		self.assertEqual(compile_script("halfflat/,40,0.8").give_pulses()[0].parameters, [0.4])
+		register_shape( EnvelopeShape( "halfflat", "constFunc", ("value",), (0.25,),
+			lambda width, height, values: [height*values[0]] ) )
+		self.assertEqual(give_waveformInfo("halfflat/", 40, 0.8).parameters, [0.2])
+		self.assertEqual(compile_script("halfflat/,40,0.8").give_pulses()[0].parameters, [0.2])
+
+
+if __name__ == '__main__':
+	unittest.main()
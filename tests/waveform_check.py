@@ -1,7 +1,9 @@
 import unittest
 
-from numpy import array
-from pulse_signal.waveform import Waveform
+from numpy import array, arange, array_equal, complex128, memmap
+from pulse_signal.waveform import Waveform, WaveformBuilder
+from pulse_signal.waveform_file import WaveformWriter, save_waveform, load_waveform
+import tempfile, os
 
 
 
@@ -16,4 +18,55 @@ class Test_to_deviceManager(unittest.TestCase):
 		self.assertEqual(test_WF.dx, dx)
 		self.assertEqual(test_WF.Y[0], ydata[0])
 
+class Test_WaveformBuilder(unittest.TestCase):
+
+	def test_build(self):
+		builder = WaveformBuilder(capacity=2)
+		builder.append(Waveform(1, 0.5, array([0,1,2])))
+		builder.extend([Waveform(0, 0.5, array([3,4])), Waveform(0, 0.5, array([5j]))])
+		built = builder.finalize()
+		self.assertEqual((built.x0, built.dx, built.points), (1, 0.5, 6))
+		self.assertTrue(array_equal(built.Y, [0,1,2,3,4,5j]))
+		self.assertIsNotNone(built.Y.base)
+		with self.assertRaises(ValueError):
+			builder.extend([Waveform(0, 1, array([0])), Waveform(0, 2, array([1]))])
+		# the next build has its own time axis, trim releases the unused capacity
+		builder.append(Waveform(3, 2, array([7])))
+		built = builder.finalize(trim=True)
+		self.assertEqual((built.x0, built.dx, built.points), (3, 2, 1))
+		self.assertIsNone(built.Y.base)
+		self.assertEqual(built.Y.shape, (1,))
+
+	def test_trim(self):
+		builder = WaveformBuilder(capacity=4)
+		builder.append(Waveform(0, 1, array([[0,1,2],[3,4,5]])))
+		built = builder.finalize(trim=True)
+		self.assertTrue(array_equal(built.Y, [[0,1,2],[3,4,5]]))
+		self.assertIsNone(built.Y.base)
+
+class Test_waveform_file(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.folder.name, "sequence.wf")
+
+	def tearDown(self):
+		self.folder.cleanup()
+
+	def test_save_load(self):
+		save_waveform(self.path, Waveform(2, 0.5, arange(10)*(1+1j)))
+		loaded = load_waveform(self.path)
+		self.assertIsInstance(loaded.Y, memmap)
+		self.assertEqual((loaded.x0, loaded.dx, loaded.Y.dtype), (2, 0.5, complex128))
+		self.assertTrue(array_equal(loaded.Y, arange(10)*(1+1j)))
+
+	def test_append_channels(self):
+		with WaveformWriter(self.path, channels=2, x0=1, dx=0.1) as writer:
+			writer.append(array([[0,1,2],[3,4,5]]))
+			self.assertEqual(load_waveform(self.path).points, 3)
+			writer.extend([array([[6],[7]]), array([[8,9],[10,11]])])
+		loaded = load_waveform(self.path)
+		self.assertEqual(loaded.Y.shape, (2,6))
+		self.assertTrue(array_equal(loaded.Y, [[0,1,2,6,8,9],[3,4,5,7,10,11]]))
+
 unittest.main()
\ No newline at end of file